@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from backend.db import check_connections_health
+
+        from .middleware import install_query_recorder
+        connection_created.connect(install_query_recorder)
+        request_started.connect(check_connections_health)
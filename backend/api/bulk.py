@@ -0,0 +1,100 @@
+"""Пакетное добавление и удаление связей пользователя с объектами.
+
+Избранное, список покупок и подписки устроены одинаково: строка
+(user, объект) с уникальной парой. Пакет из add и remove применяется
+постоянным числом запросов независимо от числа id: выборка
+существующих объектов с признаком связи, INSERT ... RETURNING,
+блокирующая выборка удаляемых связей и DELETE.
+
+Выборка с признаком связи только подсказывает, что менять: побочные
+действия (счётчики, суммы списка покупок) получают id лишь тех строк,
+которые этот запрос действительно вставил или удалил, поэтому
+параллельный запрос с той же парой не учитывается дважды.
+"""
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+CREATED = 'created'
+EXISTS = 'exists'
+REMOVED = 'removed'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+
+
+def read_links(links, field, targets, ids):
+    """{id объекта: есть ли связь} для существующих объектов из ids."""
+    return dict(targets.filter(id__in=ids).annotate(
+        linked=Exists(links.filter(**{field: OuterRef('pk')}))
+    ).values_list('id', 'linked'))
+
+
+def insert_links(model, field, links):
+    """Вставляет связи, пропуская уже существующие пары.
+
+    Возвращает id объектов во вставленных строках: ON CONFLICT DO
+    NOTHING RETURNING есть у PostgreSQL и у SQLite 3.35+.
+    """
+    meta = model._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    rows = [[f.get_db_prep_save(f.pre_save(link, True), connection)
+             for f in fields]
+            for link in links]
+    placeholders = f'({", ".join(["%s"] * len(fields))})'
+    sql = (f'INSERT INTO {meta.db_table} '
+           f'({", ".join(f.column for f in fields)}) '
+           f'VALUES {", ".join([placeholders] * len(rows))} '
+           f'ON CONFLICT DO NOTHING '
+           f'RETURNING {meta.get_field(field).column}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+        return {pk for pk, in cursor.fetchall()}
+
+
+def apply_membership_changes(user, model, field, targets, add, remove,
+                             on_add=None, on_remove=None):
+    """Добавляет связи с add и удаляет с remove, возвращает итоги.
+
+    model — модель связи, field — её поле с объектом, targets —
+    queryset объектов. on_add вызывается после вставки, on_remove —
+    до удаления, оба со списком id и id пользователя. Вызывать внутри
+    транзакции. Результат: (список {'id', 'action', 'status'} в
+    порядке запроса, id добавленных, id удалённых).
+    """
+    links = model.objects.filter(user=user)
+    found = read_links(links, field, targets, [*add, *remove])
+
+    candidates = [pk for pk in add if pk in found and not found[pk]]
+    added = []
+    if candidates:
+        inserted = insert_links(
+            model, field,
+            [model(user=user, **{f'{field}_id': pk}) for pk in candidates])
+        added = [pk for pk in candidates if pk in inserted]
+        if added and on_add is not None:
+            on_add(added, user.id)
+
+    candidates = [pk for pk in remove if found.get(pk)]
+    removed = []
+    if candidates:
+        # Блокировка ждёт параллельное удаление тех же строк, после
+        # него удалённые строки в выборку уже не попадут.
+        locked = set(links.select_for_update().filter(
+            **{f'{field}_id__in': candidates}
+        ).values_list(f'{field}_id', flat=True))
+        removed = [pk for pk in candidates if pk in locked]
+        if removed:
+            if on_remove is not None:
+                on_remove(removed, user.id)
+            links.filter(**{f'{field}_id__in': removed}).delete()
+
+    results = []
+    for action, ids, done, changed, unchanged in (
+            ('add', add, set(added), CREATED, EXISTS),
+            ('remove', remove, set(removed), REMOVED, MISSING)):
+        for pk in ids:
+            if pk not in found:
+                status = NOT_FOUND
+            else:
+                status = changed if pk in done else unchanged
+            results.append({'id': pk, 'action': action, 'status': status})
+    return results, added, removed
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import tempfile
+import uuid
+from decimal import Decimal
+
+from django.core.files import File
+from PIL import Image
+from rest_framework import serializers
+
+DECODE_CHUNK_SIZE = 64 * 1024
+IN_MEMORY_LIMIT = 1024 * 1024
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """Картинка в base64 (data URI), декодируемая по частям.
+
+    Строка декодируется кусками во временный файл, который держится в
+    памяти до IN_MEMORY_LIMIT байт и дальше уходит на диск, поэтому
+    целая декодированная копия картинки в памяти не создаётся.
+    """
+    default_error_messages = {
+        'invalid': 'Передайте картинку в формате base64.',
+        'invalid_image': 'Загруженный файл не является картинкой.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data:
+            self.fail('invalid')
+        start = data.find(',') + 1 if data.startswith('data:') else 0
+        decoded = tempfile.SpooledTemporaryFile(max_size=IN_MEMORY_LIMIT)
+        try:
+            for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+                decoded.write(base64.b64decode(
+                    data[offset:offset + DECODE_CHUNK_SIZE], validate=True))
+        except (binascii.Error, ValueError):
+            decoded.close()
+            self.fail('invalid')
+        decoded.seek(0)
+        try:
+            with Image.open(decoded) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:
+            decoded.close()
+            self.fail('invalid_image')
+        decoded.seek(0)
+        return File(
+            decoded, name=f'{uuid.uuid4().hex}.{image_format.lower()}')
+
+
+class AmountField(serializers.DecimalField):
+    """Количество числом без лишних нулей: 2, а не "2.000"; 0.5."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 10)
+        kwargs.setdefault('decimal_places', 3)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        value = self.quantize(Decimal(value))
+        if value == value.to_integral_value():
+            return int(value)
+        return float(value)
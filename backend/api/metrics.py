@@ -0,0 +1,57 @@
+import threading
+from collections import defaultdict
+
+METRICS = (
+    ('requests_total', 'counter', 'Количество запросов'),
+    ('request_duration_seconds_sum', 'counter',
+     'Суммарное время обработки запросов'),
+    ('db_queries_total', 'counter', 'Количество SQL-запросов'),
+    ('db_duration_seconds_sum', 'counter', 'Суммарное время SQL-запросов'),
+    ('view_duration_seconds_sum', 'counter',
+     'Суммарное время view без SQL и сериализаторов'),
+    ('serializer_duration_seconds_sum', 'counter',
+     'Суммарное время сериализаторов без учёта SQL'),
+    ('render_duration_seconds_sum', 'counter',
+     'Суммарное время рендеринга ответов'),
+    ('response_bytes_total', 'counter', 'Суммарный размер ответов'),
+    ('query_budget_exceeded_total', 'counter',
+     'Количество запросов, превысивших бюджет SQL-запросов'),
+)
+
+
+class MetricsRegistry:
+    """Счётчики запросов к API по именам эндпоинтов в памяти процесса."""
+
+    prefix = 'foodgram_api_'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, endpoint, **values):
+        with self._lock:
+            endpoint_values = self._values[endpoint]
+            endpoint_values['requests_total'] += 1
+            for name, value in values.items():
+                endpoint_values[name] += value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {endpoint: dict(values)
+                        for endpoint, values in self._values.items()}
+        lines = []
+        for name, metric_type, description in METRICS:
+            full_name = f'{self.prefix}{name}'
+            lines.append(f'# HELP {full_name} {description}')
+            lines.append(f'# TYPE {full_name} {metric_type}')
+            for endpoint in sorted(snapshot):
+                value = snapshot[endpoint].get(name, 0)
+                lines.append(f'{full_name}{{endpoint="{endpoint}"}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
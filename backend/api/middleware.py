@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+
+from backend.db import reads_from_replica
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+current_recorder = contextvars.ContextVar('current_recorder', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """Счётчик SQL-запросов и времени их выполнения для одного запроса.
+
+    Заодно копит время сериализаторов без SQL, выполненного внутри них.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.serializer_duration = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper, который пишет запрос в QueryRecorder контекста.
+
+    Рекордер берётся из contextvar, поэтому запросы учитываются и в
+    потоках, куда контекст скопирован через sync_to_async или пул чтения.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.duration += time.perf_counter() - started
+        recorder.count += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextlib.contextmanager
+def serializer_timer():
+    """Пишет время блока в QueryRecorder как время сериализации.
+
+    Учитывается только внешний блок: вложенные сериализаторы уже внутри
+    его времени. SQL, выполненный внутри, из времени вычитается.
+    """
+    recorder = current_recorder.get()
+    if recorder is None or recorder.serializing:
+        yield
+        return
+    recorder.serializing = True
+    started, db_duration = time.perf_counter(), recorder.duration
+    try:
+        yield
+    finally:
+        recorder.serializing = False
+        recorder.serializer_duration += (
+            time.perf_counter() - started
+            - (recorder.duration - db_duration))
+
+
+class RequestMetricsMiddleware:
+    """Собирает метрики запроса и отдаёт их в заголовке Server-Timing.
+
+    Время до process_template_response делится на SQL, сериализаторы
+    и остальной код view, после него — рендеринг ответа DRF.
+    Бюджет в API_QUERY_BUDGETS ищется сначала по ключу
+    «МЕТОД имя-url», затем по имени URL. Превышение бюджета
+    пишется в лог, а при API_QUERY_BUDGET_STRICT вызывает исключение.
+    Работает и в синхронной, и в асинхронной цепочке middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django распознаёт middleware как корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, started)
+
+    def start(self, request):
+        request.metrics_render_started = None
+        recorder = QueryRecorder()
+        return recorder, current_recorder.set(recorder), time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        finished = time.perf_counter()
+        render_started = request.metrics_render_started or finished
+        endpoint = self.get_endpoint(request)
+        total = finished - started
+        render = finished - render_started
+        serialize = recorder.serializer_duration
+        view = max(
+            render_started - started - recorder.duration - serialize, 0)
+        size = 0 if response.streaming else len(response.content)
+        over_budget = self.check_budget(
+            request.method, endpoint, recorder.count)
+        registry.observe(
+            endpoint,
+            request_duration_seconds_sum=total,
+            db_queries_total=recorder.count,
+            db_duration_seconds_sum=recorder.duration,
+            view_duration_seconds_sum=view,
+            serializer_duration_seconds_sum=serialize,
+            render_duration_seconds_sum=render,
+            response_bytes_total=size,
+            query_budget_exceeded_total=int(over_budget),
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{recorder.count} queries"',
+            f'view;dur={view * 1000:.2f}',
+            f'serialize;dur={serialize * 1000:.2f}',
+            f'render;dur={render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        return response
+
+    def process_template_response(self, request, response):
+        request.metrics_render_started = time.perf_counter()
+        return response
+
+    def get_endpoint(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.url_name or match.view_name
+
+    def check_budget(self, method, endpoint, query_count):
+        budgets = settings.API_QUERY_BUDGETS
+        budget = budgets.get(f'{method} {endpoint}', budgets.get(endpoint))
+        if budget is None or query_count <= budget:
+            return False
+        message = (f'{endpoint}: {query_count} SQL-запросов '
+                   f'при бюджете {budget}')
+        if settings.API_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает ReplicaRouter читать из реплики в безопасных запросах.
+
+    Флаг живёт в contextvar и поэтому виден в потоках sync_to_async
+    и пула чтения асинхронных view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = reads_from_replica.set(request.method in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            reads_from_replica.reset(token)
+
+    async def __acall__(self, request):
+        token = reads_from_replica.set(request.method in SAFE_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            reads_from_replica.reset(token)
@@ -1,3 +1,6 @@
+from hmac import compare_digest
+
+from django.conf import settings
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
@@ -12,3 +15,12 @@ class IsAdminOrAuthorOrReadOnly(BasePermission):
                 or obj.author == request.user
                 or request.user.is_superuser
                 or request.user.is_staff)
+
+
+class HasMetricsToken(BasePermission):
+    """Заголовок Authorization: Bearer METRICS_TOKEN для сборщика метрик."""
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        return bool(token) and compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {token}')
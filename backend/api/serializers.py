@@ -1,9 +1,17 @@
-from drf_extra_fields.fields import Base64ImageField
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from djoser.serializers import UserCreateSerializer, UserSerializer
 
+from .fields import AmountField, StreamingBase64ImageField
+from .middleware import serializer_timer
+from .sparse import SparseFieldsMixin
+
+from foodgram.images import schedule_image_processing
+from foodgram.shopping import add_to_items, subtract_from_items
+from foodgram.units import to_base
 from foodgram.models import Tag, Ingredient, ShoppingList, Recipe, FavoriteList, RecipeIngredient
 
 from users.models import Follow
@@ -11,14 +19,55 @@ from users.models import Follow
 
 User = get_user_model()
 
+PANTRY_MAX_INGREDIENTS = 50
+PANTRY_DEFAULT_MAX_MISSING = 3
+BULK_MAX_IDS = 100
+
+
+def get_followed_ids(request):
+    """Id авторов, на которых подписан пользователь запроса.
+
+    Загружаются одним запросом и запоминаются на объекте запроса,
+    поэтому все сериализаторы одного ответа используют общий набор.
+    """
+    if not request.user.is_authenticated:
+        return frozenset()
+    followed_ids = getattr(request, '_followed_ids', None)
+    if followed_ids is None:
+        followed_ids = frozenset(
+            request.user.follower.values_list('following_id', flat=True))
+        request._followed_ids = followed_ids
+    return followed_ids
+
+
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None or not recipes_limit.isdigit():
+        return None
+    return int(recipes_limit)
+
 
 class IsSubscribed:
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        if request is None:
             return False
-        return user.follower.filter(author=obj).exists()
+        return obj.id in get_followed_ids(request)
+
+
+class TimedSerializerMixin:
+    """Учитывает to_representation во времени сериализации запроса.
+
+    Для many=True время копится по элементам, вложенные сериализаторы
+    с этим же миксином входят во время внешнего.
+    """
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
 
 
 class RecipeUserSerializer(
@@ -48,30 +97,27 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return password
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                           IsSubscribed, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
-    class Meta:
+    class Meta(UserSerializer.Meta):
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
             'last_name', 'is_subscribed'
         )
 
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request.user.is_authenticated:
-            return Follow.objects.filter(user=request.user,
-                                         following=obj).exists()
-
 
-class FollowRecipesSerializer(serializers.ModelSerializer):
+class FollowRecipesSerializer(TimedSerializerMixin,
+                              serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'title', 'image', 'cooking_time')
 
 
-class FollowListSerializer(serializers.ModelSerializer):
+class FollowListSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                           IsSubscribed, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes = serializers.SerializerMethodField(read_only=True)
     recipes_count = serializers.SerializerMethodField(read_only=True)
@@ -79,29 +125,27 @@ class FollowListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'recipes', 'recipes_count', 'user_set')
-
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request.user.is_authenticated:
-            return Follow.objects.filter(user=request.user,
-                                         following=obj).exists()
+                  'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit is not None:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
         else:
             recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return FollowRecipesSerializer(
             recipes, many=True, context=context).data
 
     def get_recipes_count(self, obj):
-        return serializers.ReadOnlyField(source='recipes.count')
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
 
 
 class UserFollowSerializer(serializers.ModelSerializer):
@@ -134,13 +178,14 @@ class UserFollowSerializer(serializers.ModelSerializer):
             instance.following, context=context).data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'title', 'color', 'slug')
         model = Tag
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'title', 'measurement_unit')
         model = Ingredient
@@ -149,20 +194,38 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientsEditSerializer(serializers.ModelSerializer):
 
     id = serializers.IntegerField()
-    amount = serializers.IntegerField()
+    amount = AmountField()
+    unit = serializers.CharField(
+        max_length=200, required=False, allow_blank=True)
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'amount')
+        fields = ('id', 'amount', 'unit')
+
 
+class RecipeIngredientReadSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    title = serializers.ReadOnlyField(source='ingredient.title')
+    measurement_unit = serializers.ReadOnlyField()
+    amount = AmountField(read_only=True)
 
-class RecipeReadSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'title', 'measurement_unit', 'amount')
+
+
+class RecipeReadSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                           serializers.ModelSerializer):
+    image = serializers.ImageField(read_only=True)
+    image_variants = serializers.SerializerMethodField()
     tags = TagSerializer(
         many=True,
         read_only=True)
-    author = RecipeUserSerializer
-    ingredients = serializers.SerializerMethodField(read_only=True)
+    author = RecipeUserSerializer(read_only=True)
+    ingredients = RecipeIngredientReadSerializer(
+        source='recipe_ingredients',
+        many=True,
+        read_only=True)
     is_favorited = serializers.BooleanField(
         read_only=True)
     is_in_shopping_cart = serializers.BooleanField(
@@ -170,117 +233,221 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector',)
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_author_subscribed'):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
+
+    def get_image_variants(self, obj):
+        """Ссылки на WebP-копии; пока их нет — ссылка на оригинал."""
+        if not obj.image:
+            return {}
+        request = self.context.get('request')
+        original = obj.image.url
+        urls = {}
+        for variant in settings.RECIPE_IMAGE_VARIANTS:
+            name = obj.image_variants.get(variant)
+            url = obj.image.storage.url(name) if name else original
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class PantryQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=PANTRY_MAX_INGREDIENTS)
+    max_missing = serializers.IntegerField(
+        min_value=0, default=PANTRY_DEFAULT_MAX_MISSING)
+
+
+class PantryRecipeSerializer(RecipeReadSerializer):
+    coverage = serializers.SerializerMethodField()
+    missing_count = serializers.IntegerField(read_only=True)
+
+    def get_coverage(self, obj):
+        return round(obj.coverage, 2)
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all())
+    image = StreamingBase64ImageField()
+    tags = serializers.ListField(
+        child=serializers.IntegerField())
     ingredients = IngredientsEditSerializer(
         many=True)
     author = CustomUserSerializer(read_only=True)
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector',)
+        read_only_fields = ('favorites_count', 'in_carts_count')
 
-    def validate(self, data):
-        ingredients = data['ingredients']
-        ingredients_list = []
+    def validate_ingredients(self, ingredients):
+        if not ingredients:
+            raise serializers.ValidationError(
+                'Выберите хотя бы один ингредиент')
+        amounts = {}
         for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError({
-                    'Ингредиент уже есть'
-                })
-            ingredients_list.append(ingredient_id)
-            amount = ingredient['amount']
-            if int(amount) <= 0:
-                raise serializers.ValidationError({
-                    'Выберите хотя бы один ингредиент'
-                })
-            if not ingredients:
+            if ingredient['id'] in amounts:
+                raise serializers.ValidationError('Ингредиент уже есть')
+            if ingredient['amount'] <= 0:
                 raise serializers.ValidationError(
-                    'Выберите хотя бы один ингредиент')
-        tags = self.initial_data.get('tags')
+                    'Количество ингредиента должно быть больше 0')
+            amounts[ingredient['id']] = (
+                ingredient['amount'], ingredient.get('unit', '').strip())
+        found = Ingredient.objects.in_bulk(amounts)
+        missing = set(amounts) - set(found)
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиентов {sorted(missing)} не существует!')
+        measures = {}
+        for ingredient_id, (amount, unit) in amounts.items():
+            quantity, base_unit = to_base(
+                amount, unit or found[ingredient_id].measurement_unit)
+            measures[ingredient_id] = {
+                'amount': amount, 'unit': unit,
+                'quantity': quantity, 'base_unit': base_unit,
+            }
+        return measures
+
+    def validate_tags(self, tags):
         if not tags:
-            raise serializers.ValidationError({
-                'Нужно выбрать хотя бы один тэг'
-            })
-
-        for tag_name in tags:
-            if not Tag.objects.filter(name=tag_name).exists():
-                raise serializers.ValidationError(
-                    f'Тэга {tag_name} не существует!')
-
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError({
-                    'Тэги должны быть уникальными'
-                })
-            tags_list.append(tag)
-
-        cooking_time = self.initial_data.get('cooking_time')
-        if int(cooking_time) < 1:
-            raise serializers.ValidationError({
-                'Время приготовления должно быть больше 0'
-            })
-        return data
-
-    def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            amount = ingredient['amount']
-
-            RecipeIngredient.objects.bulk_create([
-                RecipeIngredient(
-                    recipe=recipe,
-                    ingredient=ingredient_id,
-                    amount=amount)
-            ])
-
+            raise serializers.ValidationError(
+                'Нужно выбрать хотя бы один тэг')
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError(
+                'Тэги должны быть уникальными')
+        found = Tag.objects.in_bulk(tags)
+        missing = set(tags) - set(found)
+        if missing:
+            raise serializers.ValidationError(
+                f'Тэгов {sorted(missing)} не существует!')
+        return list(found.values())
+
+    def create_ingredients(self, measures, recipe):
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                **measure)
+            for ingredient_id, measure in measures.items()
+        ])
+
+    def update_ingredients(self, measures, recipe):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        removed = current.keys() - measures.keys()
+        added = {ingredient_id: measure
+                 for ingredient_id, measure in measures.items()
+                 if ingredient_id not in current}
+        changed = []
+        for ingredient_id, measure in measures.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient and (
+                    recipe_ingredient.amount != measure['amount']
+                    or recipe_ingredient.unit != measure['unit']):
+                for field, value in measure.items():
+                    setattr(recipe_ingredient, field, value)
+                changed.append(recipe_ingredient)
+        if not (removed or added or changed):
+            return
+        # Суммы в списках покупок: старый состав вычитается, новый
+        # прибавляется, пока рецепт остаётся в ShoppingList.
+        subtract_from_items([recipe.id])
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(
+                changed, ['amount', 'unit', 'quantity', 'base_unit'])
+        self.create_ingredients(added, recipe)
+        add_to_items([recipe.id])
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=author, **validated_data)
-        recipe.tags.set(tags)  # вот так сделал, def create_tags - сократил
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags
+        ])
         self.create_ingredients(ingredients, recipe)
+        schedule_image_processing(recipe.id)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-
-        instance.tags.clear()
-        tags = validated_data.get('tags')
-        self.create_tags(tags, instance)
-
-        RecipeIngredient.objects.filter(recipe=instance).all().delete()
-        ingredients = validated_data.get('ingredients')
-        self.create_ingredients(ingredients, instance)
-
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        stale_variants = ()
+        if 'image' in validated_data:
+            # Копии старого фото: пока новые не готовы, API отдаёт
+            # оригинал, а файлы удалит обработка новой картинки.
+            stale_variants = list(instance.image_variants.values())
+            instance.image_variants = {}
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
         instance.save()
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
+        if 'image' in validated_data:
+            schedule_image_processing(instance.id, stale_variants)
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.for_read(request.user).get(pk=instance.pk)
         return RecipeReadSerializer(
             instance, context=context).data
 
 
-class RecipeRepresentationSerializer(serializers.ModelSerializer):
+class BulkMembershipSerializer(serializers.Serializer):
+    """Пакет id для добавления в избранное, список покупок или подписки."""
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        default=list,
+        max_length=BULK_MAX_IDS)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        default=list,
+        max_length=BULK_MAX_IDS)
+
+    def validate(self, data):
+        add = list(dict.fromkeys(data['add']))
+        remove = list(dict.fromkeys(data['remove']))
+        if not add and not remove:
+            raise serializers.ValidationError(
+                'Передайте id в add или remove')
+        both = set(add) & set(remove)
+        if both:
+            raise serializers.ValidationError(
+                f'Id {sorted(both)} есть и в add, и в remove')
+        return {'add': add, 'remove': remove}
+
+
+class BulkFollowSerializer(BulkMembershipSerializer):
+    def validate_add(self, add):
+        request = self.context.get('request')
+        if request and request.user.id in add:
+            raise serializers.ValidationError(
+                'Вы не можете подписаться на себя!')
+        return add
+
+
+class RecipeRepresentationSerializer(TimedSerializerMixin,
+                                     serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'title', 'image', 'cooking_time')
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
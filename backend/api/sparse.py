@@ -0,0 +1,73 @@
+"""Выборочные поля ответа: ?fields= и ?expand=.
+
+fields — имена полей через запятую, среди них могут быть профили
+из sparse_profiles вьюхи (например, card). expand добавляет к ним
+вложенные объекты — автора, теги, ингредиенты. Без fields ответ
+полный, как раньше; id отдаётся всегда.
+
+Вьюха кладёт набор полей в контекст сериализатора и строит по нему
+queryset, сериализатор с SparseFieldsMixin отбрасывает остальные поля.
+"""
+import hashlib
+
+from rest_framework import serializers
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Для вьюх: разбирает ?fields= и ?expand= один раз на запрос."""
+    sparse_profiles = {}
+
+    def get_sparse_fields(self):
+        """frozenset имён полей или None, если нужны все поля."""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        params = self.request.query_params
+        if 'fields' not in params:
+            return None
+        fields = {'id'}
+        for name in split_names(params['fields']):
+            fields.update(self.sparse_profiles.get(name, (name,)))
+        fields.update(split_names(params.get('expand', '')))
+        return frozenset(fields)
+
+    def get_sparse_key(self):
+        """Короткий ключ набора полей для кэша; '' — все поля."""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return ''
+        return hashlib.md5(
+            ','.join(sorted(fields)).encode()).hexdigest()[:12]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+
+class SparseFieldsMixin:
+    """Для сериализаторов: оставляет только поля из context['fields'].
+
+    Действует лишь на сериализатор верхнего уровня, вложенные
+    сериализаторы отдаются целиком.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        root = self.parent if isinstance(
+            self.parent, serializers.ListSerializer) else self
+        if requested is None or root.parent is not None:
+            return fields
+        unknown = requested - fields.keys()
+        if unknown:
+            raise serializers.ValidationError({'fields': [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}']})
+        return {name: field for name, field in fields.items()
+                if name in requested}
@@ -0,0 +1,110 @@
+"""Настройки подключений к базе: время жизни, проверка, реплика.
+
+DATABASES собирается из переменных окружения:
+
+    DB_CONN_MAX_AGE       время жизни постоянного соединения в секундах
+                          (0 — закрывать после каждого запроса)
+    DB_CONN_HEALTH_CHECKS проверять соединение перед повторным
+                          использованием
+    DB_PGBOUNCER          режим PgBouncer с transaction pooling:
+                          без серверных курсоров
+    DB_REPLICA_HOST       хост реплики только для чтения
+    DB_REPLICA_NAME       имя базы реплики (для SQLite — путь к файлу)
+
+Если задан DB_REPLICA_HOST или DB_REPLICA_NAME, появляется алиас
+replica, а ReplicaRouter отправляет в него чтения моделей foodgram
+и users внутри GET/HEAD/OPTIONS-запросов.
+"""
+import contextvars
+import os
+
+from django.db import connections
+
+DEFAULT_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+REPLICA_APP_LABELS = frozenset(('foodgram', 'users'))
+
+reads_from_replica = contextvars.ContextVar(
+    'reads_from_replica', default=False)
+
+
+def env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def build_databases():
+    default = {
+        'ENGINE': os.getenv(
+            'DB_ENGINE', default='django.db.backends.postgresql'),
+        'NAME': os.getenv('DB_NAME', default='postgres'),
+        'USER': os.getenv('POSTGRES_USER', default='postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
+        'HOST': os.getenv('DB_HOST', default='db'),
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default='60')),
+        # Ключ совпадает с настройкой Django 4.1+, в 3.2 его
+        # обрабатывает check_connections_health.
+        'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', True),
+        # При transaction pooling курсор не переживает транзакцию,
+        # а .iterator() без транзакции открывает серверный курсор.
+        'DISABLE_SERVER_SIDE_CURSORS': env_flag('DB_PGBOUNCER'),
+    }
+    databases = {DEFAULT_ALIAS: default}
+    replica_host = os.getenv('DB_REPLICA_HOST')
+    replica_name = os.getenv('DB_REPLICA_NAME')
+    if replica_host or replica_name:
+        databases[REPLICA_ALIAS] = {
+            **default,
+            'HOST': replica_host or default['HOST'],
+            'PORT': os.getenv('DB_REPLICA_PORT', default=default['PORT']),
+            'NAME': replica_name or default['NAME'],
+            # В тестах реплика — то же соединение, что и default.
+            'TEST': {'MIRROR': DEFAULT_ALIAS},
+        }
+    return databases
+
+
+class ReplicaRouter:
+    """Чтения foodgram и users в безопасных запросах идут в реплику.
+
+    Флаг выставляет ReplicaRoutingMiddleware; записи, миграции и
+    любые запросы вне HTTP (команды, воркеры) остаются на default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label in REPLICA_APP_LABELS
+                and reads_from_replica.get()
+                and not connections[DEFAULT_ALIAS].in_atomic_block):
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+def check_connections_health(**kwargs):
+    """Закрывает сломанные постоянные соединения до начала запроса.
+
+    Аналог CONN_HEALTH_CHECKS из Django 4.1: без проверки первый
+    запрос после рестарта базы или PgBouncer падает с ошибкой.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
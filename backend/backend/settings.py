@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 
+from .db import REPLICA_ALIAS, build_databases
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +77,14 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# wsgi — gunicorn с синхронными воркерами, asgi — gunicorn с uvicorn
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+# Асинхронные view для тэгов, ингредиентов и чтения рецептов
+ASYNC_READ_VIEWS = os.getenv(
+    'ASYNC_READ_VIEWS', default=str(SERVER_MODE == 'asgi')) == 'True'
+# Потоков (и соединений с базой) для чтения в асинхронном режиме
+ASYNC_READ_POOL_SIZE = int(os.getenv('ASYNC_READ_POOL_SIZE', default=10))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
@@ -85,22 +97,18 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 #}
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
-
-        'NAME': os.getenv('DB_NAME', default='postgres'),
-
-        'USER': os.getenv('POSTGRES_USER', default='postgres'),
-
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
+DATABASES = build_databases()
 
-        'HOST': os.getenv('DB_HOST', default='db'),
-
-        'PORT': os.getenv('DB_PORT', default='5432')
+DATABASE_ROUTERS = (
+    ['backend.db.ReplicaRouter'] if REPLICA_ALIAS in DATABASES else [])
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
-
 }
 
 
@@ -156,4 +164,69 @@ REST_FRAMEWORK = {
     ],
 } 
 
-PAGE_SIZE = 6
\ No newline at end of file
+DJOSER = {
+    'SERIALIZERS': {
+        'user': 'api.serializers.CustomUserSerializer',
+        'current_user': 'api.serializers.CustomUserSerializer',
+    },
+}
+
+PAGE_SIZE = 6
+
+# Бюджеты SQL-запросов на один запрос к эндпоинту:
+# по имени URL или по «МЕТОД имя-url»; значения — замеры
+# foodgram.tests.test_query_budgets с токеном, то есть вместе с
+# запросом аутентификации. Анонимные запросы укладываются в те же числа.
+API_QUERY_BUDGETS = {
+    'tags-list': 1,
+    'tags-detail': 1,
+    'ingredients-list': 2,
+    'ingredients-detail': 2,
+    'recipes-list': 5,
+    'POST recipes-list': 13,
+    'PUT recipes-detail': 18,
+    'PATCH recipes-detail': 18,
+    'DELETE recipes-detail': 14,
+    'recipes-detail': 4,
+    'recipes-favorite': 7,
+    'recipes-shopping-cart': 8,
+    'recipes-favorite-bulk': 8,
+    'recipes-shopping-cart-bulk': 11,
+    'recipes-download-shopping-cart': 1,
+    'recipes-feed': 5,
+    'recipes-pantry': 6,
+    'recipes-similar': 5,
+    'recipes-recommended': 6,
+    'subscribe': 8,
+    'subscribe-bulk': 7,
+    'subscriptions': 4,
+}
+API_QUERY_BUDGET_STRICT = os.getenv(
+    'API_QUERY_BUDGET_STRICT', default='False') == 'True'
+# /api/metrics/ доступен администраторам и по заголовку
+# Authorization: Bearer <METRICS_TOKEN>; пустой токен — только админам
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+# Ответы /api/recipes/ для анонимов: время жизни записей в кэше
+# и max-age для nginx и браузеров
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_RESPONSE_CACHE_TIMEOUT', default=600))
+RECIPE_RESPONSE_CACHE_MAX_AGE = int(
+    os.getenv('RECIPE_RESPONSE_CACHE_MAX_AGE', default=10))
+
+# Сколько первых id ленты подписок держать в кэше (0 — без кэша)
+RECIPE_FEED_HEAD_SIZE = int(os.getenv('RECIPE_FEED_HEAD_SIZE', default=60))
+RECIPE_FEED_HEAD_TIMEOUT = 60 * 60
+
+# Наибольшая сторона WebP-копий картинок рецептов, в пикселях
+RECIPE_IMAGE_VARIANTS = {
+    'card': 480,
+    'detail': 1024,
+    'full': 2048,
+}
+# 0 — обрабатывать картинки сразу, без фонового пула
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
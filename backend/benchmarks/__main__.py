@@ -0,0 +1,110 @@
+"""Бенчмарк публичного API.
+
+Запуск из каталога backend:
+
+    python -m benchmarks --recipes 5000 --output bench.json
+    python -m benchmarks --output new.json --compare bench.json
+
+Данные создаются во временной тестовой базе, рабочая база не
+затрагивается.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*',
+                        help='Запустить только указанные сценарии')
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    parser.add_argument('--compare',
+                        help='JSON с прошлыми результатами для сравнения')
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    header = f'{"сценарий":<28}{"p50":>10}{"p95":>10}{"p99":>10}{"SQL":>6}'
+    if baseline:
+        header += f'{"Δp95":>10}'
+    print(header)
+    for name, result in results.items():
+        line = (f'{name:<28}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["queries_max"]:>6}')
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (result['p95_ms'] / previous['p95_ms'] - 1) * 100
+            line += f'{change:>+9.1f}%'
+        if result['errors']:
+            line += f'  ошибок: {result["errors"]}'
+        print(line)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    from . import data, runner
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        dataset = data.generate(
+            users=args.users, recipes=args.recipes,
+            ingredients=args.ingredients, seed=args.seed)
+        results = runner.run(
+            dataset, iterations=args.iterations, warmup=args.warmup,
+            only=args.only, seed=args.seed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'params': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+
+from foodgram.models import (FavoriteList, Ingredient, Recipe,
+                             RecipeIngredient, ShoppingList, Tag)
+from foodgram.shopping import rebuild_items
+from foodgram.units import to_base
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark-password'
+
+
+def sample(rng, population, count):
+    return rng.sample(population, min(count, len(population)))
+
+
+def generate(users=100, recipes=1000, tags=10, ingredients=2000,
+             ingredients_per_recipe=8, follows_per_user=20,
+             favorites_per_user=30, cart_per_user=10, seed=0):
+    """Заполняет базу синтетическими данными через bulk_create.
+
+    Возвращает словарь с id созданных объектов, по которым
+    сценарии бенчмарка строят запросы.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+
+    User.objects.bulk_create([
+        User(email=f'user{i}@bench.local', username=f'user{i}',
+             first_name='Имя', last_name='Фамилия', password=password)
+        for i in range(users)
+    ], batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Token.objects.bulk_create([
+        Token(key=Token.generate_key(), user_id=user_id)
+        for user_id in user_ids
+    ], batch_size=BATCH_SIZE)
+
+    Tag.objects.bulk_create([
+        Tag(title=f'Тэг {i}', slug=f'tag-{i}',
+            color=f'#{rng.randrange(0x1000000):06X}')
+        for i in range(tags)
+    ])
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    Ingredient.objects.bulk_create([
+        Ingredient(title=f'Ингредиент {i}', title_lower=f'ингредиент {i}',
+                   measurement_unit=rng.choice(('г', 'мл', 'шт')))
+        for i in range(ingredients)
+    ], batch_size=BATCH_SIZE)
+    units = dict(Ingredient.objects.values_list('id', 'measurement_unit'))
+    ingredient_ids = list(units)
+
+    Recipe.objects.bulk_create([
+        Recipe(author_id=rng.choice(user_ids), title=f'Рецепт {i}',
+               text='Описание рецепта ' * 20,
+               cooking_time=rng.randint(5, 120))
+        for i in range(recipes)
+    ], batch_size=BATCH_SIZE)
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in sample(rng, tag_ids, rng.randint(1, 3))
+    ], batch_size=BATCH_SIZE)
+    amounts = [
+        (recipe_id, ingredient_id, rng.randint(1, 500))
+        for recipe_id in recipe_ids
+        for ingredient_id in sample(
+            rng, ingredient_ids, ingredients_per_recipe)
+    ]
+    recipe_ingredients = []
+    for recipe_id, ingredient_id, amount in amounts:
+        quantity, base_unit = to_base(amount, units[ingredient_id])
+        recipe_ingredients.append(RecipeIngredient(
+            recipe_id=recipe_id, ingredient_id=ingredient_id,
+            amount=amount, quantity=quantity, base_unit=base_unit))
+    RecipeIngredient.objects.bulk_create(
+        recipe_ingredients, batch_size=BATCH_SIZE)
+
+    Follow.objects.bulk_create([
+        Follow(user_id=user_id, following_id=author_id)
+        for user_id in user_ids
+        for author_id in sample(rng, user_ids, follows_per_user)
+        if author_id != user_id
+    ], batch_size=BATCH_SIZE)
+    for model, per_user in ((FavoriteList, favorites_per_user),
+                            (ShoppingList, cart_per_user)):
+        model.objects.bulk_create([
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in sample(rng, recipe_ids, per_user)
+        ], batch_size=BATCH_SIZE)
+    # bulk_create идёт мимо вьюх, которые ведут суммы списков покупок.
+    rebuild_items()
+    call_command('recount_recipe_counters', verbosity=0)
+
+    return {
+        'user_ids': user_ids,
+        'tokens': dict(Token.objects.values_list('user_id', 'key')),
+        'tag_slugs': list(Tag.objects.values_list('slug', flat=True)),
+        'recipe_ids': recipe_ids,
+        'ingredient_titles': list(
+            Ingredient.objects.values_list('title', flat=True)[:50]),
+    }
@@ -0,0 +1,123 @@
+import math
+import random
+import statistics
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+class Scenario:
+    """Один измеряемый запрос к API.
+
+    make_request(client, iteration) выполняет запрос и возвращает ответ;
+    authenticated определяет, отправляется ли токен пользователя.
+    """
+
+    def __init__(self, name, make_request, authenticated=True):
+        self.name = name
+        self.make_request = make_request
+        self.authenticated = authenticated
+
+
+def get(url):
+    return lambda client, iteration: client.get(url)
+
+
+def build_scenarios(dataset, seed=0):
+    rng = random.Random(seed)
+    recipe_ids = dataset['recipe_ids']
+    tag_slugs = dataset['tag_slugs']
+    user_ids = dataset['user_ids']
+    deep_page = max(len(recipe_ids) // 6 - 1, 1)
+    toggled = rng.sample(recipe_ids, min(len(recipe_ids), 50))
+
+    def toggle(action, method):
+        def make_request(client, iteration):
+            recipe_id = toggled[iteration % len(toggled)]
+            return getattr(client, method)(
+                f'/api/recipes/{recipe_id}/{action}/')
+        return make_request
+
+    return [
+        Scenario('tags-list', get('/api/tags/'), authenticated=False),
+        Scenario('ingredients-autocomplete',
+                 get('/api/ingredients/?name=Ингредиент 1'),
+                 authenticated=False),
+        Scenario('recipes-list-anonymous', get('/api/recipes/'),
+                 authenticated=False),
+        Scenario('recipes-list', get('/api/recipes/')),
+        Scenario('recipes-list-deep-page',
+                 get(f'/api/recipes/?page={deep_page}')),
+        Scenario('recipes-list-cursor', get('/api/recipes/?cursor=')),
+        Scenario('recipes-filter-tags', get(
+            f'/api/recipes/?tags={tag_slugs[0]}&tags={tag_slugs[-1]}')),
+        Scenario('recipes-filter-author',
+                 get(f'/api/recipes/?author={user_ids[1]}')),
+        Scenario('recipes-filter-favorited',
+                 get('/api/recipes/?is_favorited=1')),
+        Scenario('recipes-filter-in-cart',
+                 get('/api/recipes/?is_in_shopping_cart=1')),
+        Scenario('recipes-detail', lambda client, iteration: client.get(
+            f'/api/recipes/{recipe_ids[iteration % len(recipe_ids)]}/')),
+        Scenario('subscriptions',
+                 get('/api/users/subscriptions/?recipes_limit=3')),
+        Scenario('favorite-add', toggle('favorite', 'post')),
+        Scenario('favorite-remove', toggle('favorite', 'delete')),
+        Scenario('shopping-cart-add', toggle('shopping_cart', 'post')),
+        Scenario('shopping-cart-remove', toggle('shopping_cart', 'delete')),
+        Scenario('download-shopping-cart',
+                 get('/api/recipes/download_shopping_cart/')),
+    ]
+
+
+def run_scenario(scenario, client, iterations, warmup):
+    timings = []
+    queries = []
+    errors = 0
+    for iteration in range(-warmup, iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = scenario.make_request(client, iteration)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if iteration < 0:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(len(context.captured_queries))
+        if response.status_code >= 400:
+            errors += 1
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries_median': statistics.median(queries),
+        'queries_max': max(queries),
+    }
+
+
+def run(dataset, iterations=50, warmup=5, only=None, seed=0):
+    user_id = dataset['user_ids'][0]
+    authorization = f'Token {dataset["tokens"][user_id]}'
+    results = {}
+    for scenario in build_scenarios(dataset, seed):
+        if only and scenario.name not in only:
+            continue
+        headers = {}
+        if scenario.authenticated:
+            headers['HTTP_AUTHORIZATION'] = authorization
+        client = Client(raise_request_exception=False, **headers)
+        results[scenario.name] = run_scenario(
+            scenario, client, iterations, warmup)
+    return results
@@ -0,0 +1,115 @@
+"""Нагрузочный тест запущенного сервера: WSGI против ASGI.
+
+Сервер с заполненной базой запускается отдельно в нужном режиме,
+например:
+
+    gunicorn backend.wsgi:application -w 4
+    SERVER_MODE=asgi gunicorn backend.asgi:application -w 4 \\
+        --worker-class uvicorn.workers.UvicornWorker
+
+и для каждого режима выполняется
+
+    python -m benchmarks.throughput --label wsgi --output wsgi.json
+    python -m benchmarks.throughput --label asgi --compare wsgi.json
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .runner import percentile
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=сах',
+    '/api/recipes/',
+    '/api/recipes/?limit=12',
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.throughput')
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--paths', nargs='*', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--token', help='Токен для авторизованных запросов')
+    parser.add_argument('--label', default='server')
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    return parser.parse_args(argv)
+
+
+def load(base_url, path, concurrency, duration, token=None):
+    deadline = time.monotonic() + duration
+    timings = []
+    errors = 0
+    lock = threading.Lock()
+    headers = {'Authorization': f'Token {token}'} if token else {}
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        local_timings = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session.get(base_url + path, headers=headers)
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            local_timings.append((time.perf_counter() - started) * 1000)
+            local_errors += failed
+        with lock:
+            timings.extend(local_timings)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / duration, 1),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+    results = {}
+    print(f'{"путь":<32}{"rps":>10}{"p50":>10}{"p99":>10}')
+    for path in args.paths:
+        result = load(args.base_url, path, args.concurrency,
+                      args.duration, args.token)
+        results[path] = result
+        line = (f'{path:<32}{result["rps"]:>10.1f}'
+                f'{result["p50_ms"]:>10.2f}{result["p99_ms"]:>10.2f}')
+        previous = (baseline or {}).get('results', {}).get(path)
+        if previous and previous['rps']:
+            line += (f'  {result["rps"] / previous["rps"]:.2f}x '
+                     f'к {baseline["label"]}')
+        if result['errors']:
+            line += f'  ошибок: {result["errors"]}'
+        print(line)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'label': args.label,
+                       'concurrency': args.concurrency,
+                       'duration': args.duration,
+                       'results': results},
+                      file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
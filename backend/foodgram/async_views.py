@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from backend.db import check_connections_health
+from django.conf import settings
+from django.db import close_old_connections
+
+from .cache import cached_response, ingredient_cache, tag_cache
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+READ_METHODS = ('GET', 'HEAD')
+
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_POOL_SIZE,
+    thread_name_prefix='async-read')
+
+
+def call_with_pooled_connection(view, request, *args, **kwargs):
+    # Поток пула держит своё соединение между запросами; устаревшие
+    # (старше CONN_MAX_AGE) и сломанные соединения закрываются здесь.
+    close_old_connections()
+    check_connections_health()
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return response
+
+
+async def run_in_read_pool(view, request, *args, **kwargs):
+    """Выполняет синхронный view в пуле чтения, не занимая event loop.
+
+    Размер пула ограничивает число одновременных соединений с базой.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        read_executor,
+        functools.partial(context.run, call_with_pooled_connection,
+                          view, request, *args, **kwargs))
+
+
+def async_view(view):
+    """Асинхронная обёртка над view DRF.
+
+    GET и HEAD идут в пул чтения и обрабатываются параллельно,
+    изменяющие запросы — в общий поток Django, как в обычном режиме.
+    """
+    write_view = sync_to_async(view)
+
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await run_in_read_pool(view, request, *args, **kwargs)
+        return await write_view(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def async_reference_views(viewset, reference_cache):
+    """list и retrieve справочника прямо из снимка в памяти.
+
+    Собранный снимок отдаётся без перехода в другой поток; в пул
+    уходят только пересборка снимка и запросы с фильтрами.
+    """
+    list_view = viewset.as_view({'get': 'list'})
+    detail_view = viewset.as_view({'get': 'retrieve'})
+
+    async def get_snapshot():
+        snapshot = reference_cache.get_cached_snapshot(
+            reference_cache.get_version())
+        if snapshot is None:
+            snapshot = await asyncio.get_running_loop().run_in_executor(
+                read_executor, reference_cache.get_snapshot)
+        return snapshot
+
+    async def list_(request):
+        if request.method not in READ_METHODS or request.GET:
+            return await run_in_read_pool(list_view, request)
+        snapshot = await get_snapshot()
+        return cached_response(
+            request, snapshot.list_body, f'"{snapshot.version}"')
+
+    async def detail(request, pk):
+        snapshot = await get_snapshot()
+        body = snapshot.detail_bodies.get(pk)
+        if request.method not in READ_METHODS or body is None:
+            return await run_in_read_pool(detail_view, request, pk=str(pk))
+        return cached_response(
+            request, body, f'"{snapshot.version}-{pk}"')
+
+    list_.csrf_exempt = detail.csrf_exempt = True
+    return list_, detail
+
+
+tag_list, tag_detail = async_reference_views(TagViewSet, tag_cache)
+ingredient_list, ingredient_detail = async_reference_views(
+    IngredientViewSet, ingredient_cache)
+recipe_list = async_view(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+recipe_detail = async_view(RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
@@ -0,0 +1,94 @@
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient, Tag
+from .response_cache import cached_response
+from api.serializers import IngredientSerializer, TagSerializer
+
+Snapshot = namedtuple('Snapshot', ('version', 'list_body', 'detail_bodies'))
+
+
+class ReferenceDataCache:
+    """Снимок справочной таблицы в памяти процесса.
+
+    Номер версии хранится в общем кэше Django и увеличивается
+    сигналами при изменении таблицы; процесс пересобирает снимок,
+    только когда версия в кэше отличается от версии снимка.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.version_key = (
+            f'reference-data:{model._meta.label_lower}:version')
+        self._snapshot = None
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), timeout=None)
+
+    def get_cached_snapshot(self, version):
+        """Снимок нужной версии, если он уже собран, иначе None."""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return None
+
+    def get_snapshot(self):
+        version = self.get_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = self.build_snapshot(version)
+            self._snapshot = snapshot
+        return snapshot
+
+    def build_snapshot(self, version):
+        renderer = JSONRenderer()
+        data = self.serializer_class(
+            self.model.objects.order_by('id'), many=True).data
+        return Snapshot(
+            version=version,
+            list_body=renderer.render(data),
+            detail_bodies={item['id']: renderer.render(item)
+                           for item in data},
+        )
+
+
+tag_cache = ReferenceDataCache(Tag, TagSerializer)
+ingredient_cache = ReferenceDataCache(Ingredient, IngredientSerializer)
+
+
+class CachedReferenceMixin:
+    """Отдаёт list и retrieve из ReferenceDataCache готовыми байтами.
+
+    Запросы с параметрами фильтрации обрабатываются как обычно.
+    """
+    reference_cache = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        snapshot = self.reference_cache.get_snapshot()
+        return cached_response(
+            request, snapshot.list_body, f'"{snapshot.version}"')
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_field, ''))
+        snapshot = self.reference_cache.get_snapshot()
+        if not pk.isdigit() or int(pk) not in snapshot.detail_bodies:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, snapshot.detail_bodies[int(pk)],
+            f'"{snapshot.version}-{pk}"')
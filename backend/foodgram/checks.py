@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Бэкенды, у которых у каждого процесса своя копия кэша
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Без DEBUG кэш по умолчанию должен быть общим для всех процессов.
+
+    В нём лежат версии справочников, тела ответов и голова ленты:
+    с LocMemCache каждый воркер gunicorn видит свои версии и отдаёт
+    устаревшие данные после изменений в другом воркере.
+    """
+    if settings.DEBUG:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'Кэш по умолчанию {backend} не общий для процессов.',
+        hint='Укажите CACHE_BACKEND и CACHE_LOCATION общего кэша, '
+             'например django.core.cache.backends.memcached.'
+             'PyMemcacheCache и memcached:11211.',
+        id='foodgram.E001',
+    )]
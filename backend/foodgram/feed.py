@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, Recipe
+
+
+class FeedHeadCache:
+    """Первые id ленты пользователя в общем кэше Django.
+
+    Голова ленты сбрасывается, когда автор из подписок публикует или
+    удаляет рецепт и когда пользователь подписывается или отписывается;
+    тела рецептов в кэш не попадают и читаются из базы по id.
+    """
+    prefix = 'recipe-feed-head'
+
+    def get_key(self, user_id):
+        return f'{self.prefix}:{user_id}'
+
+    def get_head(self, user):
+        key = self.get_key(user.id)
+        head = cache.get(key)
+        if head is None:
+            head = list(Recipe.objects.filter(
+                author__following__user=user
+            ).values_list('id', flat=True)[:settings.RECIPE_FEED_HEAD_SIZE])
+            cache.set(key, head, timeout=settings.RECIPE_FEED_HEAD_TIMEOUT)
+        return head
+
+    def invalidate_users(self, user_ids):
+        keys = [self.get_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def invalidate_followers(self, author_id):
+        self.invalidate_users(Follow.objects.filter(
+            following_id=author_id).values_list('user_id', flat=True))
+
+
+feed_head_cache = FeedHeadCache()
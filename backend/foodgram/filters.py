@@ -1,26 +1,90 @@
+from django.db.models import (Case, Exists, IntegerField, OuterRef, Value,
+                              When)
 from django_filters import FilterSet, filters
+from rest_framework.filters import OrderingFilter
 
-from .models import Recipe
+from .models import FavoriteList, Ingredient, Recipe, ShoppingList
+from .search import search_recipes
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+
+class IngredientFilter(FilterSet):
+    """Автодополнение ингредиентов по началу и вхождению названия.
+
+    Совпадения по началу названия идут первыми, затем совпадения
+    по подстроке. Сравнивается title_lower со строкой в нижнем
+    регистре, так что кириллица находится без учёта регистра и на
+    SQLite. На PostgreSQL начало названия ищется по индексу поля,
+    подстрока — по триграммному индексу из миграции 0013.
+    """
+    name = filters.CharFilter(method='get_name')
+
+    class Meta:
+        model = Ingredient
+        fields = ['name']
+
+    def get_name(self, queryset, name, value):
+        value = value.lower()
+        return queryset.filter(title_lower__contains=value).annotate(
+            is_prefix=Case(
+                When(title_lower__startswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('is_prefix', 'title')[:INGREDIENT_SEARCH_LIMIT]
 
 
 class RecipeFilter(FilterSet):
+    """Фильтры списка рецептов.
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    Тэги проверяются одним подзапросом EXISTS, избранное и список
+    покупок — подзапросом IN по индексу (user, recipe). Соединения
+    не размножают строки рецептов, и DISTINCT не нужен. Поиск
+    сортирует выдачу по релевантности, если не задан ?ordering.
+    """
+    author = filters.NumberFilter(field_name='author_id')
+    tags = filters.CharFilter(method='get_tags')
     is_favorited = filters.NumberFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.NumberFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='get_search')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search']
+
+    def get_tags(self, queryset, name, value):
+        slugs = self.data.getlist('tags')
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=slugs)))
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_by_user_list(self, queryset, model, value):
+        if not value:
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(id__in=model.objects.filter(
+            user=user).values('recipe_id'))
 
     def get_is_favorited(self, queryset, name, value):
-        if value:
-            return queryset.filter(favorite__user=self.request.user)
-        return queryset
+        return self.filter_by_user_list(queryset, FavoriteList, value)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return queryset.filter(shoppingcart__user=self.request.user)
-        return queryset
+        return self.filter_by_user_list(queryset, ShoppingList, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов с добором по id для стабильных страниц."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id'} & set(ordering):
+            ordering = [*ordering, '-id']
+        return ordering
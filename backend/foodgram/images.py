@@ -0,0 +1,115 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .response_cache import recipe_response_cache
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = 'WEBP'
+VARIANT_QUALITY = 80
+
+executor = None
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-images')
+    return executor
+
+
+def variant_name(image_name, variant):
+    return f'{os.path.splitext(image_name)[0]}_{variant}.webp'
+
+
+def build_variants(image_name):
+    """Сохраняет уменьшенные WebP-копии картинки, от большей к меньшей.
+
+    Каждая следующая копия уменьшается из предыдущей, а не из
+    оригинала, чтобы не масштабировать большое фото несколько раз.
+    """
+    sizes = sorted(settings.RECIPE_IMAGE_VARIANTS.items(),
+                   key=lambda item: item[1], reverse=True)
+    variants = {}
+    with default_storage.open(image_name) as source:
+        with Image.open(source) as original:
+            largest = sizes[0][1]
+            original.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+            for variant, max_side in sizes:
+                image.thumbnail((max_side, max_side))
+                buffer = io.BytesIO()
+                image.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+                variants[variant] = default_storage.save(
+                    variant_name(image_name, variant),
+                    ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Не удалось удалить файл %s', name)
+
+
+def process_recipe_image(recipe_id, stale_variants=()):
+    """Строит копии картинки рецепта и удаляет копии прежнего фото.
+
+    Если картинку успели сменить ещё раз, построенные копии удаляются:
+    их обработает следующая задача.
+    """
+    try:
+        image_name = Recipe.objects.filter(
+            pk=recipe_id).values_list('image', flat=True).first()
+        if not image_name:
+            return
+        variants = build_variants(image_name)
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=image_name
+        ).update(image_variants=variants)
+        if not updated:
+            delete_files(variants.values())
+            return
+        recipe_response_cache.invalidate_recipe(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать картинку рецепта %s',
+                         recipe_id)
+    finally:
+        # На старые копии уже ничего не ссылается.
+        delete_files(stale_variants)
+
+
+def process_in_worker(recipe_id, stale_variants=()):
+    try:
+        process_recipe_image(recipe_id, stale_variants)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe_id, stale_variants=()):
+    """Ставит обработку картинки в пул после фиксации транзакции.
+
+    stale_variants — файлы копий прежней картинки, они удаляются после
+    обработки. При RECIPE_IMAGE_WORKERS = 0 картинка обрабатывается сразу.
+    """
+    if not settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: process_recipe_image(recipe_id, stale_variants))
+        return
+    transaction.on_commit(lambda: get_executor().submit(
+        process_in_worker, recipe_id, stale_variants))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodgram.similarity import build_similarity_index
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает похожие рецепты по избранному и ингредиентам '
+            'для /similar/ и /recommended/')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=20,
+            help='Сколько соседей хранить для каждого рецепта')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько рецептов обрабатывать за один блок')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = build_similarity_index(
+            options['top_k'], options['chunk_size'])
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Сохранено пар: {total} за '
+                f'{time.monotonic() - started:.1f} с'))
@@ -0,0 +1,127 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from foodgram.filters import RecipeFilter
+from foodgram.models import Recipe, Tag
+
+User = get_user_model()
+
+WATCHED_TABLES = (
+    'foodgram_recipe',
+    'foodgram_recipe_tags',
+    'foodgram_recipeingredient',
+    'foodgram_favoritelist',
+    'foodgram_shoppinglist',
+    'users_follow',
+)
+
+FILTER_COMBINATIONS = (
+    '',
+    'author={author}',
+    'tags={tag}',
+    'tags={tag}&tags={other_tag}',
+    'is_favorited=1',
+    'is_in_shopping_cart=1',
+    'author={author}&tags={tag}',
+    'tags={tag}&is_favorited=1',
+    'is_favorited=1&is_in_shopping_cart=1',
+)
+
+ORDERINGS = (
+    ('-id',),
+    ('-favorites_count', '-id'),
+    ('-in_carts_count', '-id'),
+)
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?! USING)')
+
+
+def explain(queryset):
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    # Без seq scan планировщик покажет, есть ли вообще подходящий
+    # индекс, даже на маленькой тестовой базе.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def find_problems(plan):
+    if connection.vendor == 'postgresql':
+        return sorted({f'Seq Scan on {table}'
+                       for table in SEQ_SCAN.findall(plan)
+                       if table in WATCHED_TABLES})
+    # SQLite: обход foodgram_recipe по первичному ключу тоже выглядит
+    # как SCAN, поэтому для неё полное сканирование — это SCAN,
+    # после которого весь результат сортируется во временном B-дереве.
+    scanned = set(SQLITE_SCAN.findall(plan)) & set(WATCHED_TABLES)
+    recipe_table = Recipe._meta.db_table
+    problems = {f'SCAN {table}' for table in scanned
+                if table != recipe_table}
+    if (recipe_table in scanned
+            and 'USE TEMP B-TREE FOR ORDER BY' in plan):
+        problems.add(f'SCAN {recipe_table} с сортировкой')
+    return sorted(problems)
+
+
+def check_recipe_list_plans(user, tags):
+    """(метка, план, проблемы) для каждой комбинации фильтров и сортировки.
+
+    tags — slug одного или двух тэгов. Используется командой
+    check_query_plans и тестом планов на PostgreSQL.
+    """
+    request = RequestFactory().get('/')
+    request.user = user
+    values = {'author': user.id, 'tag': tags[0], 'other_tag': tags[-1]}
+    for combination in FILTER_COMBINATIONS:
+        params = combination.format(**values)
+        for ordering in ORDERINGS:
+            queryset = RecipeFilter(
+                QueryDict(params),
+                queryset=Recipe.objects.for_read(user),
+                request=request,
+            ).qs.order_by(*ordering)[:settings.PAGE_SIZE]
+            plan = explain(queryset)
+            label = f'?{params} ordering={",".join(ordering)}'
+            yield label, plan, find_problems(plan)
+
+
+class Command(BaseCommand):
+    help = ('Строит EXPLAIN для каждой комбинации фильтров списка '
+            'рецептов и завершается с ошибкой при полном сканировании '
+            'больших таблиц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы запросов целиком')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(
+                f'План для {connection.vendor} не поддерживается')
+        user = User.objects.order_by('id').first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        if user is None or not tags:
+            raise CommandError('Нужен хотя бы один пользователь и тэг')
+
+        failures = []
+        for label, plan, problems in check_recipe_list_plans(user, tags):
+            if options['verbose_plans']:
+                self.stdout.write(f'{label}\n{plan}\n')
+            if problems:
+                failures.append(f'{label}: {", ".join(problems)}')
+
+        if failures:
+            raise CommandError(
+                'Найдены полные сканирования:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено комбинаций: '
+            f'{len(FILTER_COMBINATIONS) * len(ORDERINGS)}'))
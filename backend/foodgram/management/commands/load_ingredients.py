@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.cache import ingredient_cache
+from foodgram.models import Ingredient
+from foodgram.response_cache import recipe_response_cache
+from foodgram.shopping import normalize_quantities
+
+READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 5000
+
+
+def iter_json(stream):
+    """Построчно разбирает JSON-массив объектов, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), ''):
+        buffer += chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise CommandError('Ожидается JSON-массив объектов')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break
+            yield item
+        buffer = buffer[pos:]
+    if buffer.strip():
+        raise CommandError('Файл JSON обрывается на середине')
+
+
+def iter_csv(stream):
+    reader = csv.reader(stream)
+    for row in reader:
+        if not row or row[0] in ('name', 'title'):
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def iter_rows(items):
+    for item in items:
+        title = (item.get('name') or item.get('title') or '').strip()
+        if title:
+            yield title, item.get('measurement_unit', '').strip()
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из JSON или CSV файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .json или .csv')
+        parser.add_argument(
+            '--format', choices=('json', 'csv'),
+            help='Формат файла; по умолчанию берётся из расширения')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Количество строк в одной пачке')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (options['format']
+                       or os.path.splitext(path)[1].lstrip('.').lower())
+        if file_format not in ('json', 'csv'):
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        parse = iter_json if file_format == 'json' else iter_csv
+        started = time.monotonic()
+        with open(path, encoding='utf-8', newline='') as stream:
+            rows = iter_rows(parse(stream))
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    total = self.load_with_copy(rows, options['batch_size'])
+                else:
+                    total = self.load_with_orm(rows, options['batch_size'])
+                # Загрузка могла сменить единицы у ингредиентов рецептов.
+                normalize_quantities()
+        ingredient_cache.invalidate()
+        # bulk-операции идут мимо сигналов, а ингредиенты и их единицы
+        # входят в закэшированные тела рецептов.
+        recipe_response_cache.invalidate_all()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} строк/с)'))
+
+    def load_with_copy(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_staging '
+                '(title varchar(200), title_lower varchar(200), '
+                'measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            for batch in batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    (title, title.lower(), unit) for title, unit in batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging '
+                    '(title, title_lower, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)', buffer)
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (title, title_lower, measurement_unit) '
+                f'SELECT DISTINCT ON (title) '
+                f'title, title_lower, measurement_unit '
+                f'FROM ingredient_staging ORDER BY title '
+                f'ON CONFLICT (title) DO UPDATE '
+                f'SET measurement_unit = EXCLUDED.measurement_unit'
+            )
+        return total
+
+    def load_with_orm(self, rows, batch_size):
+        total = 0
+        for batch in batches(rows, batch_size):
+            units = dict(batch)
+            existing = Ingredient.objects.in_bulk(
+                list(units), field_name='title')
+            changed = []
+            for title, ingredient in existing.items():
+                if ingredient.measurement_unit != units[title]:
+                    ingredient.measurement_unit = units[title]
+                    changed.append(ingredient)
+            Ingredient.objects.bulk_update(changed, ['measurement_unit'])
+            Ingredient.objects.bulk_create(
+                [Ingredient(title=title, title_lower=title.lower(),
+                            measurement_unit=unit)
+                 for title, unit in units.items() if title not in existing],
+                ignore_conflicts=True
+            )
+            total += len(batch)
+        return total
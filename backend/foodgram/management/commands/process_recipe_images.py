@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from foodgram.images import process_recipe_image
+from foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Строит WebP-копии картинок рецептов, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать копии для всех рецептов')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        processed = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            process_recipe_image(recipe_id)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}'))
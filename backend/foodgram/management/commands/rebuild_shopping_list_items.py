@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodgram.models import ShoppingListItem
+from foodgram.shopping import rebuild_items
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает суммы ингредиентов списков покупок '
+            'по ShoppingList и RecipeIngredient')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя; по умолчанию — все списки')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_items(options['user'])
+        if options['verbosity']:
+            items = ShoppingListItem.objects.all()
+            if options['user'] is not None:
+                items = items.filter(user_id=options['user'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Позиций в списках покупок: {items.count()}'))
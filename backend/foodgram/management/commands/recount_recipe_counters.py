@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from foodgram.models import Recipe
+from foodgram.response_cache import recipe_response_cache
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного и списков покупок '
+            'у рецептов, где они разошлись с данными')
+
+    def handle(self, *args, **options):
+        drifted = Recipe.objects.with_actual_counters().filter(
+            ~Q(favorites_count=F('actual_favorites_count'))
+            | ~Q(in_carts_count=F('actual_in_carts_count'))
+        )
+        updated = Recipe.objects.filter(
+            id__in=list(drifted.values_list('id', flat=True))
+        ).with_actual_counters().update(
+            favorites_count=F('actual_favorites_count'),
+            in_carts_count=F('actual_in_carts_count'),
+        )
+        if updated:
+            recipe_response_cache.invalidate_all()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено рецептов: {updated}'))
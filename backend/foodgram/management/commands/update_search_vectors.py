@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from foodgram.search import (inverted_index, update_search_vectors,
+                             uses_search_vector)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает поисковые векторы рецептов, например после '
+            'массовой загрузки в обход сигналов')
+
+    def handle(self, *args, **options):
+        if uses_search_vector():
+            update_search_vectors()
+        else:
+            inverted_index.invalidate()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                'Поисковые векторы обновлены'))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+INDEXES = (
+    ('foodgram_ingredient_title_prefix',
+     'CREATE INDEX IF NOT EXISTS foodgram_ingredient_title_prefix '
+     'ON foodgram_ingredient (UPPER(title) text_pattern_ops)'),
+    ('foodgram_ingredient_title_trgm',
+     'CREATE INDEX IF NOT EXISTS foodgram_ingredient_title_trgm '
+     'ON foodgram_ingredient USING gin (UPPER(title) gin_trgm_ops)'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for _, sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
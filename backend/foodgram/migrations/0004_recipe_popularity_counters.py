@@ -0,0 +1,52 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:27
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_for_recipe(model):
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(recipe=models.OuterRef('pk'))
+            .values('recipe').annotate(count=models.Count('id'))
+            .values('count')
+        ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    Recipe.objects.update(
+        favorites_count=count_for_recipe(
+            apps.get_model('foodgram', 'FavoriteList')),
+        in_carts_count=count_for_recipe(
+            apps.get_model('foodgram', 'ShoppingList')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0003_ingredient_title_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В списках покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-in_carts_count', '-id'], name='recipe_in_carts_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
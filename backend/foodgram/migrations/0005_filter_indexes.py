@@ -0,0 +1,30 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_recipe_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX foodgram_recipe_tags_tag_recipe_idx '
+            'ON foodgram_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX foodgram_recipe_tags_tag_recipe_idx',
+        ),
+        migrations.AddIndex(
+            model_name='favoritelist',
+            index=models.Index(fields=['user', '-date_created'], name='favoritelist_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', '-date_created'], name='shoppinglist_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = 'foodgram_recipe_search_vector_gin'
+
+BACKFILL_SQL = """
+    UPDATE foodgram_recipe SET search_vector =
+        setweight(to_tsvector('russian', foodgram_recipe.title), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.title, ' ')
+            FROM foodgram_recipeingredient recipe_ingredient
+            JOIN foodgram_ingredient ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = foodgram_recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', foodgram_recipe.text), 'C')
+"""
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        f'ON foodgram_recipe USING gin (search_vector)')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
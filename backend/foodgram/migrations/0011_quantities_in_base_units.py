@@ -0,0 +1,74 @@
+# Generated by Django 3.2.12 on 2026-10-18 19:40
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Множители единиц на момент миграции; foodgram.units может меняться
+# дальше, а миграция должна давать тот же результат.
+FACTORS = {
+    'г': 1, 'гр': 1, 'грамм': 1, 'кг': 1000, 'килограмм': 1000,
+    'мг': Decimal('0.001'),
+    'мл': 1, 'миллилитр': 1, 'л': 1000, 'литр': 1000, 'стакан': 250,
+    'стл': 15, 'столоваяложка': 15, 'чл': 5, 'чайнаяложка': 5,
+    'капля': Decimal('0.05'),
+    'шт': 1, 'штука': 1, 'десяток': 10,
+}
+
+REFILL_SQL = [
+    'DELETE FROM foodgram_shoppinglistitem',
+    'INSERT INTO foodgram_shoppinglistitem '
+    '(user_id, ingredient_id, total_quantity) '
+    'SELECT cart.user_id, recipe_ingredient.ingredient_id, '
+    'SUM(recipe_ingredient.quantity) '
+    'FROM foodgram_shoppinglist cart '
+    'JOIN foodgram_recipeingredient recipe_ingredient '
+    'ON recipe_ingredient.recipe_id = cart.recipe_id '
+    'GROUP BY cart.user_id, recipe_ingredient.ingredient_id',
+]
+
+
+def unit_factor(unit):
+    return Decimal(FACTORS.get(re.sub(r'[\s.]+', '', unit.lower()), 1))
+
+
+def fill_quantities(apps, schema_editor):
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    RecipeIngredient = apps.get_model('foodgram', 'RecipeIngredient')
+    quantity_field = RecipeIngredient._meta.get_field('quantity')
+    units = Ingredient.objects.values_list('measurement_unit', flat=True)
+    for unit in units.order_by().distinct():
+        RecipeIngredient.objects.filter(
+            ingredient__measurement_unit=unit
+        ).update(quantity=models.ExpressionWrapper(
+            models.F('amount') * models.Value(unit_factor(unit)),
+            output_field=quantity_field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0010_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=14, verbose_name='Количество в базовых единицах'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_quantities, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='shoppinglistitem',
+            name='total_amount',
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='total_quantity',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Количество в базовых единицах'),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(REFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 3.2.12 on 2026-10-18 21:10
+
+import re
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations, models
+
+# Базовые единицы на момент миграции, см. 0011 и foodgram.units
+BASE_UNITS = {
+    'г': 'г', 'гр': 'г', 'грамм': 'г', 'кг': 'г', 'килограмм': 'г',
+    'мг': 'г',
+    'мл': 'мл', 'миллилитр': 'мл', 'л': 'мл', 'литр': 'мл',
+    'стакан': 'мл', 'стл': 'мл', 'столоваяложка': 'мл', 'чл': 'мл',
+    'чайнаяложка': 'мл', 'капля': 'мл',
+    'шт': 'шт.', 'штука': 'шт.', 'десяток': 'шт.',
+}
+
+REFILL_SQL = [
+    'DELETE FROM foodgram_shoppinglistitem',
+    'INSERT INTO foodgram_shoppinglistitem '
+    '(user_id, ingredient_id, base_unit, total_quantity) '
+    'SELECT cart.user_id, recipe_ingredient.ingredient_id, '
+    'recipe_ingredient.base_unit, SUM(recipe_ingredient.quantity) '
+    'FROM foodgram_shoppinglist cart '
+    'JOIN foodgram_recipeingredient recipe_ingredient '
+    'ON recipe_ingredient.recipe_id = cart.recipe_id '
+    'GROUP BY cart.user_id, recipe_ingredient.ingredient_id, '
+    'recipe_ingredient.base_unit',
+]
+
+
+def base_unit(unit):
+    return BASE_UNITS.get(re.sub(r'[\s.]+', '', unit.lower()), unit)
+
+
+def fill_base_units(apps, schema_editor):
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    RecipeIngredient = apps.get_model('foodgram', 'RecipeIngredient')
+    units = Ingredient.objects.values_list('measurement_unit', flat=True)
+    for unit in units.order_by().distinct():
+        RecipeIngredient.objects.filter(
+            ingredient__measurement_unit=unit
+        ).update(base_unit=base_unit(unit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0011_quantities_in_base_units'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='amount',
+            field=models.DecimalField(decimal_places=3, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.001'), 'больше нуля')], verbose_name='Количество'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='unit',
+            field=models.CharField(blank=True, help_text='Пусто — единица измерения ингредиента', max_length=200, verbose_name='Единица измерения'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='base_unit',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Базовая единица'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_base_units, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='shoppinglistitem',
+            name='unique_shopping_list_item',
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='base_unit',
+            field=models.CharField(default='', max_length=200, verbose_name='Базовая единица'),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient', 'base_unit'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunSQL(REFILL_SQL, migrations.RunSQL.noop),
+    ]
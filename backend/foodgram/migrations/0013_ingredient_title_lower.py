@@ -0,0 +1,61 @@
+# Generated by Django 3.2.12 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+OLD_INDEXES = (
+    ('foodgram_ingredient_title_prefix',
+     'CREATE INDEX IF NOT EXISTS foodgram_ingredient_title_prefix '
+     'ON foodgram_ingredient (UPPER(title) text_pattern_ops)'),
+    ('foodgram_ingredient_title_trgm',
+     'CREATE INDEX IF NOT EXISTS foodgram_ingredient_title_trgm '
+     'ON foodgram_ingredient USING gin (UPPER(title) gin_trgm_ops)'),
+)
+# Префикс ищется по индексу самого поля (db_index), подстрока — здесь
+TRGM_INDEX = (
+    'CREATE INDEX IF NOT EXISTS foodgram_ingredient_title_lower_trgm '
+    'ON foodgram_ingredient USING gin (title_lower gin_trgm_ops)'
+)
+
+
+def fill_title_lower(apps, schema_editor):
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    ingredients = list(Ingredient.objects.only('id', 'title'))
+    for ingredient in ingredients:
+        ingredient.title_lower = ingredient.title.lower()
+    Ingredient.objects.bulk_update(
+        ingredients, ['title_lower'], batch_size=1000)
+
+
+def replace_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in OLD_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    schema_editor.execute(TRGM_INDEX)
+
+
+def restore_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS foodgram_ingredient_title_lower_trgm')
+    for _, sql in OLD_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0012_recipe_ingredient_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='title_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200, verbose_name='Название в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_title_lower, migrations.RunPython.noop),
+        migrations.RunPython(replace_indexes, restore_indexes),
+    ]
@@ -1,12 +1,32 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, RowNumber
 
 from colorfield.fields import ColorField
 
+from users.models import Follow
+
 User = get_user_model()
 
 MIN_TIME = 1
+# Поля рецепта в превью подписок
+PREVIEW_FIELDS = ('id', 'title', 'image', 'cooking_time', 'author')
+USER_FLAGS = ('is_favorited', 'is_in_shopping_cart', 'is_author_subscribed')
+# Поля RecipeReadSerializer → столбцы рецепта, нужные для их вывода
+READ_FIELD_COLUMNS = {
+    'title': ('title',),
+    'image': ('image',),
+    'image_variants': ('image', 'image_variants'),
+    'text': ('text',),
+    'cooking_time': ('cooking_time',),
+    'author': ('author',),
+    'favorites_count': ('favorites_count',),
+    'in_carts_count': ('in_carts_count',),
+}
 
 
 class Tag(models.Model):
@@ -26,6 +46,13 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     """Ингредиенты"""
     title = models.CharField(max_length=200, unique=True, verbose_name='Название')
+    # title.lower() для автодополнения: LIKE и UPPER в SQLite не
+    # различают регистр только у латиницы. Для bulk_create заполняется
+    # вызывающим кодом.
+    title_lower = models.CharField(
+        max_length=200, db_index=True, editable=False,
+        verbose_name='Название в нижнем регистре',
+    )
     measurement_unit = models.CharField(
         max_length=200,
         verbose_name='Единицы измерения',
@@ -38,6 +65,140 @@ class Ingredient(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.title_lower = self.title.lower()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_lower'}
+        super().save(*args, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов для чтения через API"""
+
+    def with_user_flags(self, user, flags=USER_FLAGS):
+        if not user.is_authenticated:
+            return self.annotate(**{
+                flag: models.Value(False, output_field=models.BooleanField())
+                for flag in flags
+            })
+        expressions = {
+            'is_favorited': models.Exists(FavoriteList.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            'is_in_shopping_cart': models.Exists(ShoppingList.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            'is_author_subscribed': models.Exists(Follow.objects.filter(
+                user=user, following=models.OuterRef('author'))),
+        }
+        return self.annotate(**{flag: expressions[flag] for flag in flags})
+
+    def for_read(self, user, fields=None, ordering=()):
+        """Рецепты для RecipeReadSerializer.
+
+        fields — поля ответа из ?fields=, None — все. Столбцы,
+        связанные объекты и флаги пользователя загружаются только для
+        запрошенных полей и полей сортировки ordering: курсор пагинации
+        читает их у рецептов страницы.
+        """
+        if fields is None:
+            # Поисковый вектор в ответ не попадает, а весит как весь текст.
+            return self.defer('search_vector').select_related(
+                'author'
+            ).prefetch_related(
+                'tags',
+                models.Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient')
+                ),
+            ).with_user_flags(user)
+        columns = {name.lstrip('-')
+                   for name in ordering or self.model._meta.ordering}
+        columns.add('id')
+        for name in fields:
+            columns.update(READ_FIELD_COLUMNS.get(name, ()))
+        queryset = self.only(*columns)
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')
+            ))
+        flags = [flag for flag in USER_FLAGS if flag in fields]
+        if 'author' in fields:
+            flags.append('is_author_subscribed')
+        return queryset.with_user_flags(user, flags)
+
+    def with_pantry_coverage(self, ingredient_ids):
+        """Доля ингредиентов рецепта, которые есть среди ingredient_ids.
+
+        Один запрос с группировкой: кандидаты — рецепты хотя бы с одним
+        ингредиентом из списка (индекс по ingredient_id), для каждого
+        считаются все и имеющиеся ингредиенты.
+        """
+        owned = models.Q(recipe_ingredients__ingredient_id__in=ingredient_ids)
+        return self.filter(id__in=RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids).values('recipe_id')
+        ).annotate(
+            total_count=models.Count('recipe_ingredients'),
+            owned_count=models.Count('recipe_ingredients', filter=owned),
+        ).annotate(
+            missing_count=models.F('total_count') - models.F('owned_count'),
+            coverage=(
+                Cast('owned_count', models.FloatField())
+                / Cast('total_count', models.FloatField())
+            ),
+        )
+
+    def with_actual_counters(self):
+        return self.annotate(
+            actual_favorites_count=Coalesce(
+                models.Subquery(
+                    FavoriteList.objects.filter(
+                        recipe=models.OuterRef('pk')
+                    ).values('recipe').annotate(
+                        count=models.Count('id')).values('count')
+                ), 0),
+            actual_in_carts_count=Coalesce(
+                models.Subquery(
+                    ShoppingList.objects.filter(
+                        recipe=models.OuterRef('pk')
+                    ).values('recipe').annotate(
+                        count=models.Count('id')).values('count')
+                ), 0),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Последние рецепты авторов одним запросом, только поля превью.
+
+        При заданном limit на каждого автора приходится не больше limit
+        рецептов: строки нумеруются ROW_NUMBER() в окне по автору.
+        """
+        recipes = self.filter(author_id__in=author_ids).only(*PREVIEW_FIELDS)
+        if limit is None:
+            return recipes.order_by('author_id', '-id')
+        ranked = recipes.order_by().annotate(
+            position=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=models.F('id').desc(),
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        columns = ', '.join(
+            f'ranked.{self.model._meta.get_field(name).column}'
+            for name in PREVIEW_FIELDS)
+        return self.model.objects.raw(
+            f'SELECT {columns} FROM ({sql}) ranked '
+            f'WHERE ranked.position <= %s '
+            f'ORDER BY ranked.author_id, ranked.id DESC',
+            (*params, limit)
+        )
+
 
 class Recipe(models.Model):
     """Рецепт"""
@@ -53,6 +214,12 @@ class Recipe(models.Model):
         upload_to='foodgram/',
         blank=True
     )
+    image_variants = models.JSONField(
+        'Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(verbose_name='Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -75,9 +242,40 @@ class Recipe(models.Model):
         ]
     )
 
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['-in_carts_count', '-id'],
+                name='recipe_in_carts_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title[:15]
@@ -86,12 +284,27 @@ class Recipe(models.Model):
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
     )
     ingredient = models.ForeignKey(
         Ingredient, on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
     )
-    amount = models.IntegerField(
-        'Количество', validators=[MinValueValidator(1, 'не менее 1шт')],
+    amount = models.DecimalField(
+        'Количество', max_digits=10, decimal_places=3,
+        validators=[MinValueValidator(Decimal('0.001'), 'больше нуля')],
+    )
+    unit = models.CharField(
+        'Единица измерения', max_length=200, blank=True,
+        help_text='Пусто — единица измерения ингредиента',
+    )
+    # amount в базовых единицах (г, мл, шт.), см. foodgram.units
+    quantity = models.DecimalField(
+        'Количество в базовых единицах', max_digits=14, decimal_places=3,
+        editable=False,
+    )
+    base_unit = models.CharField(
+        'Базовая единица', max_length=200, editable=False,
     )
 
     class Meta:
@@ -103,10 +316,21 @@ class RecipeIngredient(models.Model):
                 name='ingredient_in_recepie'
             )
         ]
+        indexes = [
+            # Подбор рецептов по ингредиентам без чтения таблицы
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='recipeingredient_ingr_rec_idx'
+            ),
+        ]
+
+    @property
+    def measurement_unit(self):
+        return self.unit or self.ingredient.measurement_unit
 
     def __str__(self):
-        return f'Ингредиент {self.ingredient.name}' \
-               f' содержится в рецепте {self.recipe.name}'
+        return f'Ингредиент {self.ingredient.title}' \
+               f' содержится в рецепте {self.recipe.title}'
 
 
 class ShoppingList(models.Model):
@@ -139,11 +363,61 @@ class ShoppingList(models.Model):
                 name='shoppinglist'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-date_created'],
+                name='shoppinglist_user_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} - {self.recipe} - {self.date_created}'
 
 
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам в списке покупок.
+
+    Отдельная строка на каждую базовую единицу, в которой ингредиент
+    указан в рецептах.
+
+    Обновляется приращениями при добавлении и удалении рецептов из
+    списка и при изменении их ингредиентов, см. foodgram.shopping.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    base_unit = models.CharField(
+        max_length=200,
+        verbose_name='Базовая единица'
+    )
+    total_quantity = models.DecimalField(
+        max_digits=14, decimal_places=3,
+        verbose_name='Количество в базовых единицах'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient', 'base_unit'],
+                name='unique_shopping_list_item'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient_id}: {self.total_quantity}'
+
+
 class FavoriteList(models.Model):
 
     recipe = models.ForeignKey(
@@ -174,6 +448,12 @@ class FavoriteList(models.Model):
                 name='unique_favoritelist'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-date_created'],
+                name='favoritelist_user_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} - {self.recipe} - {self.date_created}'
@@ -216,3 +496,42 @@ class FavoriteList(models.Model):
 #             f'- {self.user.username} '
 #             f'подписался на {self.author.username}'
 #         )
+
+
+class SimilarRecipe(models.Model):
+    """Ближайшие соседи рецепта из индекса похожести.
+
+    Таблица целиком пересобирается командой build_similarity_index.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name='Рецепт'
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Похожесть')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'neighbor'],
+                name='unique_similar_recipe'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} → {self.neighbor_id}: {self.score:.3f}'
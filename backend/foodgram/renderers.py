@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Строки списка отдаются генератором stream() прямо в
+    StreamingHttpResponse. render() вызывается DRF только для
+    ответов с ошибками и возвращает их в виде JSON.
+    """
+    charset = 'utf-8'
+    filename = 'shopping_cart'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+    def get_filename(self):
+        return f'{self.filename}.{self.format}'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(['Ингредиент', 'Количество', 'Единицы'])
+        for title, unit, amount in rows:
+            yield writer.writerow([title, amount, unit])
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield 'Список покупок\n\n'
+        for title, unit, amount in rows:
+            yield f'{title} ({unit}) — {amount}\n'
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    """PDF со списком покупок.
+
+    Таблица ссылок PDF пишется в конце файла, поэтому документ
+    собирается в памяти целиком; его размер ограничен числом
+    разных ингредиентов, а не числом рецептов в корзине.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def stream(self, rows):
+        if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT))
+        buffer = io.BytesIO()
+        page = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        top = height - PDF_MARGIN
+        page.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+        page.drawString(PDF_MARGIN, top, 'Список покупок')
+        y = top - 2 * PDF_FONT_SIZE
+        for title, unit, amount in rows:
+            if y < PDF_MARGIN:
+                page.showPage()
+                page.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+                y = top
+            page.drawString(PDF_MARGIN, y, f'{title} ({unit}) — {amount}')
+            y -= PDF_FONT_SIZE * 1.5
+        page.save()
+        yield buffer.getvalue()
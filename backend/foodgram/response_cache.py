@@ -0,0 +1,228 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+
+from api.sparse import split_names
+
+CACHED_LIST_PARAMS = frozenset(
+    ('tags', 'author', 'page', 'limit', 'fields', 'expand'))
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+
+def cached_response(request, body, etag):
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+class RecipeResponseCache:
+    """Готовые JSON-ответы рецептов для анонимных пользователей.
+
+    Ключи строятся из счётчиков поколений, поэтому для инвалидации
+    ничего не удаляется — увеличивается поколение, и старые записи
+    вытесняются по таймауту:
+
+        shared      — теги, ингредиенты и авторы, входят во все ключи;
+        membership  — состав выборок: создание и удаление рецептов,
+                      смена их тегов;
+        recipe:<id> — содержимое одного рецепта.
+
+    Тело рецепта хранится отдельно и общее для detail и всех страниц
+    списка, поэтому добавление в избранное пересобирает один рецепт,
+    а не все закэшированные страницы.
+    """
+    prefix = 'recipe-response'
+
+    def generation_key(self, scope):
+        return f'{self.prefix}:generation:{scope}'
+
+    def get_generations(self, scopes):
+        keys = {self.generation_key(scope): scope for scope in scopes}
+        found = cache.get_many(keys)
+        for key in keys.keys() - found.keys():
+            cache.add(key, time.time_ns(), timeout=None)
+        if len(found) < len(keys):
+            found = cache.get_many(keys)
+        return {keys[key]: value for key, value in found.items()}
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            key = self.generation_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+
+    def bump_on_commit(self, *scopes):
+        # До коммита параллельный запрос ещё видит старые данные и
+        # сохранил бы их под новым поколением.
+        transaction.on_commit(lambda: self.bump(*scopes))
+
+    def invalidate_recipe(self, recipe_id, membership=False):
+        scopes = [f'recipe:{recipe_id}']
+        if membership:
+            scopes.append('membership')
+        self.bump_on_commit(*scopes)
+
+    def invalidate_recipes(self, recipe_ids):
+        self.bump_on_commit(
+            *(f'recipe:{recipe_id}' for recipe_id in recipe_ids))
+
+    def invalidate_all(self):
+        self.bump_on_commit('shared')
+
+    def get_list_key(self, request, generations):
+        """Ключ страницы списка или None, если запрос не кэшируется."""
+        params = request.query_params
+        if not params.keys() <= CACHED_LIST_PARAMS:
+            return None
+        if any(len(params.getlist(name)) > 1
+               for name in CACHED_LIST_PARAMS - {'tags'}):
+            return None
+        # fields и expand попадают в тела и в ссылки next/previous.
+        normalized = (
+            request.get_host(),
+            sorted(set(params.getlist('tags'))),
+            params.get('author'),
+            params.get('page'),
+            params.get('limit'),
+            *(sorted(split_names(params[name])) if name in params else None
+              for name in ('fields', 'expand')),
+        )
+        digest = hashlib.md5(repr(normalized).encode()).hexdigest()
+        return (f'{self.prefix}:page:{generations["shared"]}:'
+                f'{generations["membership"]}:{digest}')
+
+    def get_body_key(self, host, fieldset, recipe_id, generations):
+        # В теле абсолютные ссылки на картинки, они зависят от хоста;
+        # fieldset — ключ набора полей из ?fields=.
+        return (f'{self.prefix}:body:{host}:{fieldset}:{recipe_id}:'
+                f'{generations["shared"]}:'
+                f'{generations[f"recipe:{recipe_id}"]}')
+
+    def get_bodies(self, host, fieldset, recipe_ids, generations):
+        keys = {self.get_body_key(host, fieldset, pk, generations): pk
+                for pk in recipe_ids}
+        return {keys[key]: body
+                for key, body in cache.get_many(keys).items()}
+
+    def set_bodies(self, host, fieldset, bodies, generations):
+        cache.set_many(
+            {self.get_body_key(host, fieldset, pk, generations): body
+             for pk, body in bodies.items()},
+            timeout=settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+
+
+recipe_response_cache = RecipeResponseCache()
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def public_response(request, body, etag):
+    response = cached_response(request, body, etag)
+    response['Cache-Control'] = (
+        f'public, max-age={settings.RECIPE_RESPONSE_CACHE_MAX_AGE}')
+    response['Vary'] = 'Authorization'
+    return response
+
+
+class AnonymousRecipeCacheMixin:
+    """list и retrieve рецептов для анонимов из RecipeResponseCache.
+
+    Страница списка хранит только обёртку пагинации и id рецептов,
+    тела рецептов собираются из общих записей. Запросы с токеном и
+    с параметрами кроме tags, author, page, limit, fields и expand
+    идут мимо кэша. Тела хранятся отдельно для каждого набора полей,
+    поэтому вьюхе нужен get_sparse_key из api.sparse.SparseFieldsetMixin.
+    """
+    response_cache = recipe_response_cache
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        generations = self.response_cache.get_generations(
+            ('shared', 'membership'))
+        page_key = self.response_cache.get_list_key(request, generations)
+        if page_key is None:
+            return super().list(request, *args, **kwargs)
+        page = cache.get(page_key)
+        if page is None:
+            page = self.build_list_page(request)
+            if page is None:
+                return super().list(request, *args, **kwargs)
+            cache.set(page_key, page,
+                      timeout=settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+        head, ids = page
+        generations.update(self.response_cache.get_generations(
+            [f'recipe:{pk}' for pk in ids]))
+        etag = make_etag(page_key, self.get_sparse_key(),
+                         [generations[f'recipe:{pk}'] for pk in ids])
+        if etag_matches(request, etag):
+            return public_response(request, b'', etag)
+        bodies = self.get_recipe_bodies(request, ids, generations)
+        if not bodies.keys() >= set(ids):
+            # Рецепт удалён, а поколение состава ещё не увеличено.
+            return super().list(request, *args, **kwargs)
+        body = (head[:-1] + b',"results":['
+                + b','.join(bodies[pk] for pk in ids) + b']}')
+        return public_response(request, body, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_field, ''))
+        if request.user.is_authenticated or not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        pk = int(pk)
+        generations = self.response_cache.get_generations(
+            ('shared', f'recipe:{pk}'))
+        etag = make_etag(generations['shared'], generations[f'recipe:{pk}'],
+                         self.get_sparse_key())
+        if etag_matches(request, etag):
+            return public_response(request, b'', etag)
+        bodies = self.get_recipe_bodies(request, [pk], generations)
+        if pk not in bodies:
+            return super().retrieve(request, *args, **kwargs)
+        return public_response(request, bodies[pk], etag)
+
+    def build_list_page(self, request):
+        queryset = self.filter_queryset(self.queryset.all())
+        page = self.paginate_queryset(queryset.only('id'))
+        if page is None:
+            return None
+        envelope = self.get_paginated_response(None).data
+        envelope.pop('results')
+        return JSONRenderer().render(envelope), [recipe.id for recipe in page]
+
+    def get_recipe_bodies(self, request, recipe_ids, generations):
+        host = request.get_host()
+        fieldset = self.get_sparse_key()
+        bodies = self.response_cache.get_bodies(
+            host, fieldset, recipe_ids, generations)
+        missing = [pk for pk in recipe_ids if pk not in bodies]
+        if missing:
+            renderer = JSONRenderer()
+            serializer = self.get_serializer(
+                self.get_queryset().filter(id__in=missing), many=True)
+            built = {item['id']: renderer.render(item)
+                     for item in serializer.data}
+            self.response_cache.set_bodies(
+                host, fieldset, built, generations)
+            bodies.update(built)
+        return bodies
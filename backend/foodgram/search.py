@@ -0,0 +1,177 @@
+"""Полнотекстовый поиск рецептов.
+
+На PostgreSQL поиск идёт по колонке Recipe.search_vector с GIN-индексом
+из миграции 0007: название с весом A, названия ингредиентов — B,
+описание — C. Колонка обновляется одним UPDATE после коммита
+транзакции, изменившей рецепт, его ингредиенты или ингредиент.
+
+На других базах (SQLite в тестах и локальной разработке) используется
+обратный индекс в памяти процесса с теми же весами.
+"""
+import re
+import time
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, When
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+
+# Веса ts_rank по умолчанию для меток A, B и C
+TITLE_WEIGHT = 1.0
+INGREDIENT_WEIGHT = 0.4
+TEXT_WEIGHT = 0.2
+
+UPDATE_VECTORS_SQL = """
+    UPDATE {recipe} SET search_vector =
+        setweight(to_tsvector(%(config)s, {recipe}.title), 'A')
+        || setweight(to_tsvector(%(config)s, coalesce((
+            SELECT string_agg(ingredient.title, ' ')
+            FROM {recipe_ingredient} recipe_ingredient
+            JOIN {ingredient} ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = {recipe}.id
+        ), '')), 'B')
+        || setweight(to_tsvector(%(config)s, {recipe}.text), 'C')
+""".format(
+    recipe=Recipe._meta.db_table,
+    recipe_ingredient=RecipeIngredient._meta.db_table,
+    ingredient=Ingredient._meta.db_table,
+)
+
+WORD_RE = re.compile(r'\w+')
+# Грубая замена стеммера snowball для резервного индекса
+ENDINGS = sorted((
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ой', 'ей',
+    'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ах', 'ях', 'ом',
+    'ем', 'ам', 'ям', 'ов', 'ев', 'а', 'я', 'о', 'е', 'ы', 'и', 'у',
+    'ю', 'ь',
+), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids=None):
+    """Пересчитывает search_vector у рецептов, у всех при None."""
+    sql = UPDATE_VECTORS_SQL
+    params = {'config': SEARCH_CONFIG}
+    if recipe_ids is not None:
+        sql += f' WHERE {Recipe._meta.db_table}.id = ANY(%(ids)s)'
+        params['ids'] = list(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(text)]
+
+
+class InvertedIndex:
+    """Обратный индекс рецептов в памяти процесса.
+
+    Как и ReferenceDataCache, сверяет номер версии в общем кэше Django
+    и пересобирается целиком, когда версия изменилась.
+    """
+    version_key = 'recipe-search:version'
+
+    def __init__(self):
+        self._version = None
+        self._postings = {}
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), timeout=None)
+
+    def get_postings(self):
+        version = self.get_version()
+        if self._version != version:
+            self._postings = self.build()
+            self._version = version
+        return self._postings
+
+    def build(self):
+        postings = defaultdict(lambda: defaultdict(float))
+
+        def add(recipe_id, text, weight):
+            for term in tokenize(text):
+                postings[term][recipe_id] += weight
+
+        for recipe_id, title, text in Recipe.objects.values_list(
+                'id', 'title', 'text').iterator():
+            add(recipe_id, title, TITLE_WEIGHT)
+            add(recipe_id, text, TEXT_WEIGHT)
+        for recipe_id, title in RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient__title').iterator():
+            add(recipe_id, title, INGREDIENT_WEIGHT)
+        return {term: dict(scores) for term, scores in postings.items()}
+
+    def search(self, query):
+        """id рецептов со всеми словами запроса, по убыванию веса."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = self.get_postings()
+        matches = [postings.get(term, {}) for term in terms]
+        found = set.intersection(*(set(scores) for scores in matches))
+        ranks = {pk: sum(scores[pk] for scores in matches) for pk in found}
+        return sorted(found, key=lambda pk: (-ranks[pk], -pk))
+
+
+inverted_index = InvertedIndex()
+
+
+def search_recipes(queryset, value):
+    """Рецепты по запросу, упорядоченные по релевантности."""
+    if uses_search_vector():
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+    ids = inverted_index.search(value)
+    return queryset.filter(id__in=ids).annotate(
+        search_rank=Case(
+            *(When(id=pk, then=-position)
+              for position, pk in enumerate(ids)),
+            default=None,
+            output_field=IntegerField(),
+        )
+    ).order_by('-search_rank', '-id')
+
+
+def refresh_recipes(recipe_ids):
+    """Обновляет поиск по рецептам после коммита транзакции."""
+    recipe_ids = list(recipe_ids)
+    if uses_search_vector():
+        transaction.on_commit(lambda: update_search_vectors(recipe_ids))
+    else:
+        transaction.on_commit(inverted_index.invalidate)
+
+
+def refresh_ingredient(ingredient_id):
+    refresh_recipes(RecipeIngredient.objects.filter(
+        ingredient_id=ingredient_id).values_list('recipe_id', flat=True))
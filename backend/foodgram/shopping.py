@@ -0,0 +1,146 @@
+"""Поддержка ShoppingListItem — суммы ингредиентов списка покупок.
+
+Каждая операция — один INSERT ... ON CONFLICT или UPDATE по рецептам
+из списка, без пересчёта всего списка пользователя. Синтаксис
+ON CONFLICT одинаков у PostgreSQL и SQLite 3.24+. Суммируется
+quantity — количество в базовых единицах — по паре (ингредиент,
+базовая единица), см. foodgram.units.
+"""
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, Value
+
+from .models import (Ingredient, RecipeIngredient, ShoppingList,
+                     ShoppingListItem)
+from .response_cache import recipe_response_cache
+from .units import lookup
+
+ITEMS = ShoppingListItem._meta.db_table
+RECIPE_INGREDIENTS = RecipeIngredient._meta.db_table
+SHOPPING_LIST = ShoppingList._meta.db_table
+
+# Суммы ингредиентов рецептов для выбранных строк списка покупок;
+# WHERE обязателен для SQLite перед ON CONFLICT.
+ADD_SQL = f"""
+    INSERT INTO {ITEMS} (user_id, ingredient_id, base_unit, total_quantity)
+    SELECT cart.user_id, recipe_ingredient.ingredient_id,
+           recipe_ingredient.base_unit, SUM(recipe_ingredient.quantity)
+    FROM {SHOPPING_LIST} cart
+    JOIN {RECIPE_INGREDIENTS} recipe_ingredient
+        ON recipe_ingredient.recipe_id = cart.recipe_id
+    WHERE {{where}}
+    GROUP BY cart.user_id, recipe_ingredient.ingredient_id,
+             recipe_ingredient.base_unit
+    ON CONFLICT (user_id, ingredient_id, base_unit) DO UPDATE
+    SET total_quantity = {ITEMS}.total_quantity + excluded.total_quantity
+"""
+
+SUBTRACT_SQL = f"""
+    UPDATE {ITEMS} SET total_quantity = {ITEMS}.total_quantity - (
+        SELECT SUM(recipe_ingredient.quantity)
+        FROM {SHOPPING_LIST} cart
+        JOIN {RECIPE_INGREDIENTS} recipe_ingredient
+            ON recipe_ingredient.recipe_id = cart.recipe_id
+        WHERE {{where}}
+            AND cart.user_id = {ITEMS}.user_id
+            AND recipe_ingredient.ingredient_id = {ITEMS}.ingredient_id
+            AND recipe_ingredient.base_unit = {ITEMS}.base_unit
+    )
+    WHERE EXISTS (
+        SELECT 1
+        FROM {SHOPPING_LIST} cart
+        JOIN {RECIPE_INGREDIENTS} recipe_ingredient
+            ON recipe_ingredient.recipe_id = cart.recipe_id
+        WHERE {{where}}
+            AND cart.user_id = {ITEMS}.user_id
+            AND recipe_ingredient.ingredient_id = {ITEMS}.ingredient_id
+            AND recipe_ingredient.base_unit = {ITEMS}.base_unit
+    )
+"""
+
+DELETE_EMPTY_SQL = f"""
+    DELETE FROM {ITEMS} WHERE total_quantity <= 0 AND user_id IN (
+        SELECT cart.user_id FROM {SHOPPING_LIST} cart WHERE {{where}}
+    )
+"""
+
+
+def cart_condition(recipe_ids=None, user_id=None):
+    conditions, params = ['1 = 1'], []
+    if recipe_ids is not None:
+        conditions.append(
+            f'cart.recipe_id IN ({", ".join(["%s"] * len(recipe_ids))})')
+        params.extend(recipe_ids)
+    if user_id is not None:
+        conditions.append('cart.user_id = %s')
+        params.append(user_id)
+    return ' AND '.join(conditions), params
+
+
+def add_to_items(recipe_ids=None, user_id=None):
+    """Прибавляет ингредиенты рецептов из списков покупок к суммам.
+
+    Рецепты должны уже лежать в ShoppingList; без user_id — у всех
+    пользователей, в чьих списках они есть. recipe_ids — список.
+    """
+    if recipe_ids is not None and not recipe_ids:
+        return
+    where, params = cart_condition(recipe_ids, user_id)
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_SQL.format(where=where), params)
+
+
+def subtract_from_items(recipe_ids=None, user_id=None):
+    """Вычитает ингредиенты рецептов, пока они ещё в ShoppingList."""
+    if recipe_ids is not None and not recipe_ids:
+        return
+    where, params = cart_condition(recipe_ids, user_id)
+    with connection.cursor() as cursor:
+        cursor.execute(SUBTRACT_SQL.format(where=where), params * 2)
+        cursor.execute(DELETE_EMPTY_SQL.format(where=where), params)
+
+
+def rebuild_items(user_id=None):
+    """Пересчитывает суммы с нуля, у всех или у одного пользователя."""
+    items = ShoppingListItem.objects.all()
+    if user_id is not None:
+        items = items.filter(user_id=user_id)
+    items.delete()
+    add_to_items(user_id=user_id)
+
+
+def normalize_quantities(ingredient_ids=None):
+    """Пересчитывает quantity после смены единиц у ингредиентов.
+
+    Затрагивает только строки без своей единицы в рецепте: по одному
+    UPDATE на каждую единицу среди ingredient_ids (без них — среди
+    всех ингредиентов). Суммы в списках покупок пересобираются только
+    по ингредиентам, у которых что-то изменилось.
+    """
+    ingredients = Ingredient.objects.all()
+    if ingredient_ids is not None:
+        ingredients = ingredients.filter(id__in=ingredient_ids)
+    quantity_field = RecipeIngredient._meta.get_field('quantity')
+    changed = set()
+    units = ingredients.values_list('measurement_unit', flat=True)
+    for unit in units.order_by().distinct():
+        base, factor = lookup(unit)
+        quantity = ExpressionWrapper(
+            F('amount') * Value(factor), output_field=quantity_field)
+        stale = RecipeIngredient.objects.filter(
+            unit='',
+            ingredient__in=ingredients.filter(measurement_unit=unit)
+        ).exclude(quantity=quantity, base_unit=base)
+        changed.update(
+            stale.values_list('ingredient_id', flat=True).distinct())
+        stale.update(quantity=quantity, base_unit=base)
+    if not changed:
+        return
+    recipe_response_cache.invalidate_all()
+    if ingredient_ids is None:
+        rebuild_items()
+        return
+    ShoppingListItem.objects.filter(ingredient_id__in=changed).delete()
+    where = (f'recipe_ingredient.ingredient_id IN '
+             f'({", ".join(["%s"] * len(changed))})')
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_SQL.format(where=where), list(changed))
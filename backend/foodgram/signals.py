@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .cache import ingredient_cache, tag_cache
+from .feed import feed_head_cache
+from .models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+from .response_cache import recipe_response_cache
+from .search import refresh_ingredient, refresh_recipes
+from .shopping import normalize_quantities, subtract_from_items
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_cache(**kwargs):
+    tag_cache.invalidate()
+    recipe_response_cache.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_cache(instance, **kwargs):
+    ingredient_cache.invalidate()
+    recipe_response_cache.invalidate_all()
+    if not kwargs.get('created'):
+        refresh_ingredient(instance.id)
+
+
+@receiver(post_save, sender=Ingredient)
+def normalize_ingredient_quantities(instance, created, **kwargs):
+    # Единицы могли смениться, а quantity хранится в базовых.
+    if not created:
+        normalize_quantities([instance.id])
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(instance, created, **kwargs):
+    recipe_response_cache.invalidate_recipe(instance.id, membership=created)
+    refresh_recipes([instance.id])
+    if created:
+        feed_head_cache.invalidate_followers(instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_deleted_recipe(instance, **kwargs):
+    recipe_response_cache.invalidate_recipe(instance.id, membership=True)
+    feed_head_cache.invalidate_followers(instance.author_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def subtract_deleted_recipe(instance, **kwargs):
+    # Строки ShoppingList удалятся каскадом, суммы — нет.
+    subtract_from_items([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_follower_feed(instance, **kwargs):
+    feed_head_cache.invalidate_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        recipe_response_cache.invalidate_all()
+    else:
+        recipe_response_cache.invalidate_recipe(
+            instance.id, membership=True)
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def invalidate_recipe_ingredients(instance, **kwargs):
+    recipe_response_cache.invalidate_recipe(instance.recipe_id)
+    refresh_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author(created, update_fields, **kwargs):
+    # У нового пользователя нет рецептов, а вход обновляет только
+    # last_login — ни то, ни другое не меняет ответы.
+    if created or update_fields and set(update_fields) == {'last_login'}:
+        return
+    recipe_response_cache.invalidate_all()
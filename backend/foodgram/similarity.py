@@ -0,0 +1,138 @@
+"""Индекс похожести рецептов для /similar/ и /recommended/.
+
+Похожесть пары рецептов — взвешенная сумма двух мер:
+
+    косинус по совместному добавлению в избранное
+        co(i, j) / sqrt(fav(i) * fav(j))
+    коэффициент Жаккара по наборам ингредиентов
+        |I(i) ∩ I(j)| / |I(i) ∪ I(j)|
+
+Обе считаются разреженными произведениями матриц по блокам строк,
+так что в памяти одновременно только блок chunk_size × число рецептов.
+"""
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from .models import FavoriteList, Recipe, RecipeIngredient, SimilarRecipe
+
+FAVORITE_WEIGHT = 0.6
+INGREDIENT_WEIGHT = 0.4
+# Ингредиенты из большей доли рецептов (соль, вода) не различают
+# рецепты, а пересечения по ним делают блоки почти плотными.
+MAX_INGREDIENT_SHARE = 0.2
+INSERT_BATCH_SIZE = 5000
+
+
+def build_incidence(pairs, row_index):
+    """Бинарная CSR-матрица по парам id (строка, столбец) из базы.
+
+    Строки идут в порядке row_index, столбцы — по возрастанию id.
+    """
+    rows, columns = [], []
+    for row, column in pairs:
+        position = row_index.get(row)
+        if position is not None:
+            rows.append(position)
+            columns.append(column)
+    column_ids, columns = np.unique(
+        np.array(columns, dtype=np.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(row_index), len(column_ids)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def top_k(scores, k):
+    """Позиции и значения k наибольших элементов каждой строки."""
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        data = scores.data[start:end]
+        indices = scores.indices[start:end]
+        if len(data) > k:
+            best = np.argpartition(-data, k - 1)[:k]
+            data, indices = data[best], indices[best]
+        order = np.argsort(-data, kind='stable')
+        yield row, indices[order], data[order]
+
+
+def iter_neighbors(recipe_ids, ingredients, favorites, k, chunk_size,
+                   favorite_weight=FAVORITE_WEIGHT,
+                   ingredient_weight=INGREDIENT_WEIGHT):
+    """(recipe_id, neighbor_id, score) для k лучших соседей рецептов.
+
+    ingredients — рецепты × ингредиенты, favorites — пользователи ×
+    рецепты, обе бинарные CSR-матрицы в порядке recipe_ids.
+    """
+    ingredient_counts = np.asarray(ingredients.sum(axis=1)).ravel()
+    favorite_counts = np.asarray(favorites.sum(axis=0)).ravel()
+    common = np.asarray(ingredients.sum(axis=0)).ravel() > (
+        MAX_INGREDIENT_SHARE * max(len(recipe_ids), 1))
+    distinctive = ingredients @ sparse.diags(
+        (~common).astype(np.float32))
+    distinctive.eliminate_zeros()
+    distinctive_t = distinctive.T.tocsr()
+    favorites_t = favorites.T.tocsr()
+    favorites_norm = np.sqrt(np.maximum(favorite_counts, 1))
+
+    for begin in range(0, len(recipe_ids), chunk_size):
+        end = min(begin + chunk_size, len(recipe_ids))
+
+        shared = (distinctive[begin:end] @ distinctive_t).tocoo()
+        union = (ingredient_counts[begin + shared.row]
+                 + ingredient_counts[shared.col] - shared.data)
+        jaccard = sparse.csr_matrix(
+            (shared.data / np.maximum(union, 1), (shared.row, shared.col)),
+            shape=shared.shape)
+
+        together = (favorites_t[begin:end] @ favorites).tocoo()
+        cosine = sparse.csr_matrix(
+            (together.data / (favorites_norm[begin + together.row]
+                              * favorites_norm[together.col]),
+             (together.row, together.col)),
+            shape=together.shape)
+
+        scores = (ingredient_weight * jaccard
+                  + favorite_weight * cosine).tocoo()
+        other = scores.col != scores.row + begin
+        scores = sparse.csr_matrix(
+            (scores.data[other], (scores.row[other], scores.col[other])),
+            shape=scores.shape)
+        for row, columns, values in top_k(scores, k):
+            recipe_id = recipe_ids[begin + row]
+            for column, value in zip(columns, values):
+                yield recipe_id, recipe_ids[column], float(value)
+
+
+def build_similarity_index(k, chunk_size):
+    """Пересчитывает SimilarRecipe целиком, возвращает число строк."""
+    recipe_ids = list(
+        Recipe.objects.order_by('id').values_list('id', flat=True))
+    recipe_index = {recipe_id: position
+                    for position, recipe_id in enumerate(recipe_ids)}
+    ingredients = build_incidence(
+        RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id').iterator(),
+        recipe_index)
+    favorites = build_incidence(
+        FavoriteList.objects.values_list(
+            'recipe_id', 'user_id').iterator(),
+        recipe_index).T.tocsr()
+    neighbors = iter_neighbors(
+        recipe_ids, ingredients, favorites, k, chunk_size)
+    total = 0
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        while True:
+            batch = [SimilarRecipe(recipe_id=recipe_id,
+                                   neighbor_id=neighbor_id, score=score)
+                     for recipe_id, neighbor_id, score
+                     in islice(neighbors, INSERT_BATCH_SIZE)]
+            if not batch:
+                return total
+            SimilarRecipe.objects.bulk_create(batch)
+            total += len(batch)
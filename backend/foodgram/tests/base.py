@@ -0,0 +1,84 @@
+import base64
+import io
+
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from foodgram.models import Ingredient, Recipe, RecipeIngredient, Tag
+from foodgram.units import to_base
+from users.models import User
+
+
+def make_image(color=(200, 100, 50)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class RecipeDataMixin:
+    """Пользователи, теги, ингредиенты и рецепты для тестов API."""
+    recipes_count = 10
+
+    @classmethod
+    def create_data(cls):
+        cls.users = [
+            User.objects.create(
+                email=f'user{i}@example.com', username=f'user{i}',
+                first_name='Имя', last_name='Фамилия')
+            for i in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(title=f'Тег {i}', slug=f'tag{i}',
+                               color='#000000')
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(title=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(6)
+        ]
+        cls.recipes = [cls.create_recipe(i) for i in range(cls.recipes_count)]
+
+    @classmethod
+    def create_recipe(cls, number, author=None, amounts=None):
+        recipe = Recipe.objects.create(
+            author=author or cls.users[number % len(cls.users)],
+            title=f'Рецепт {number}', text='Описание', cooking_time=10)
+        recipe.tags.set(cls.tags[:1 + number % len(cls.tags)])
+        if amounts is None:
+            amounts = {
+                cls.ingredients[(number + shift) % len(cls.ingredients)]: 10
+                + shift
+                for shift in range(3)
+            }
+        for ingredient, amount in amounts.items():
+            quantity, base_unit = to_base(amount, ingredient.measurement_unit)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount,
+                quantity=quantity, base_unit=base_unit)
+        return recipe
+
+    def authorize(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+class RecipeDataTestCase(RecipeDataMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_data()
+
+    def setUp(self):
+        cache.clear()
+
+
+class RecipeDataTransactionTestCase(RecipeDataMixin, APITransactionTestCase):
+    """Для проверок, где важны on_commit и настоящие коммиты."""
+
+    def setUp(self):
+        cache.clear()
+        self.create_data()
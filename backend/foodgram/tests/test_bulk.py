@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.db.models import F
+
+from api import bulk
+from foodgram.models import (FavoriteList, Recipe, ShoppingList,
+                             ShoppingListItem)
+from foodgram.shopping import add_to_items, subtract_from_items
+from users.models import Follow
+
+from .base import RecipeDataTestCase
+
+
+class BulkMembershipTest(RecipeDataTestCase):
+    recipes_count = 4
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.authorize(self.user)
+
+    def post(self, url, **data):
+        return self.client.post(url, data, format='json')
+
+    def test_favorite_statuses(self):
+        FavoriteList.objects.create(user=self.user, recipe=self.recipes[1])
+        missing_id = max(recipe.id for recipe in self.recipes) + 1
+        response = self.post('/api/recipes/favorite/bulk/',
+                             add=[self.recipes[0].id, self.recipes[1].id,
+                                  missing_id],
+                             remove=[self.recipes[2].id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['id'], item['status']) for item in response.data['results']],
+            [(self.recipes[0].id, 'created'), (self.recipes[1].id, 'exists'),
+             (missing_id, 'not_found'), (self.recipes[2].id, 'missing')])
+        self.assertEqual(
+            set(FavoriteList.objects.filter(
+                user=self.user).values_list('recipe_id', flat=True)),
+            {self.recipes[0].id, self.recipes[1].id})
+
+    def test_remove_updates_counters(self):
+        ids = [recipe.id for recipe in self.recipes[:2]]
+        self.post('/api/recipes/favorite/bulk/', add=ids)
+        response = self.post('/api/recipes/favorite/bulk/', remove=ids)
+        self.assertEqual(
+            {item['status'] for item in response.data['results']},
+            {'removed'})
+        self.assertEqual(
+            set(Recipe.objects.filter(id__in=ids).values_list(
+                'favorites_count', flat=True)), {0})
+        self.assertFalse(FavoriteList.objects.filter(user=self.user).exists())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # Токен, выборка, INSERT, UPDATE счётчиков и точка сохранения.
+        ids = [recipe.id for recipe in self.recipes]
+        for batch in (ids[:1], ids[1:]):
+            with self.subTest(size=len(batch)):
+                with self.assertNumQueries(6):
+                    self.post('/api/recipes/favorite/bulk/', add=batch)
+
+    def test_invalid_batches(self):
+        for data in ({}, {'add': [self.recipes[0].id],
+                          'remove': [self.recipes[0].id]},
+                     {'add': list(range(1, 102))}):
+            with self.subTest(data=data):
+                response = self.post('/api/recipes/shopping_cart/bulk/',
+                                     **data)
+                self.assertEqual(response.status_code, 400)
+
+    def test_follow(self):
+        authors = self.users[1:]
+        response = self.post('/api/users/subscribe/bulk/',
+                             add=[author.id for author in authors])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+        response = self.post('/api/users/subscribe/bulk/',
+                             add=[self.user.id])
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkRaceTest(RecipeDataTestCase):
+    """Пара, изменённая параллельным запросом после выборки связей."""
+    recipes_count = 2
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.recipe = self.recipes[0]
+        self.authorize(self.user)
+
+    def race(self, concurrent):
+        def read_links(*args, **kwargs):
+            found = original(*args, **kwargs)
+            concurrent()
+            return found
+        original = bulk.read_links
+        return mock.patch('api.bulk.read_links', read_links)
+
+    def state(self):
+        return (
+            Recipe.objects.get(pk=self.recipe.pk).in_carts_count,
+            dict(ShoppingListItem.objects.filter(user=self.user).values_list(
+                'ingredient_id', 'total_quantity')),
+        )
+
+    def add_concurrently(self):
+        ShoppingList.objects.create(user=self.user, recipe=self.recipe)
+        add_to_items([self.recipe.id], self.user.id)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            in_carts_count=F('in_carts_count') + 1)
+
+    def remove_concurrently(self):
+        subtract_from_items([self.recipe.id], self.user.id)
+        ShoppingList.objects.filter(
+            user=self.user, recipe=self.recipe).delete()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            in_carts_count=F('in_carts_count') - 1)
+
+    def test_link_inserted_after_read_is_not_counted_twice(self):
+        self.add_concurrently()
+        expected = self.state()
+        ShoppingList.objects.all().delete()
+        ShoppingListItem.objects.all().delete()
+        Recipe.objects.update(in_carts_count=0)
+        with self.race(self.add_concurrently):
+            response = self.client.post('/api/recipes/shopping_cart/bulk/',
+                                        {'add': [self.recipe.id]},
+                                        format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'exists')
+        self.assertEqual(self.state(), expected)
+
+    def test_link_deleted_after_read_is_not_subtracted_twice(self):
+        self.add_concurrently()
+        with self.race(self.remove_concurrently):
+            response = self.client.post('/api/recipes/shopping_cart/bulk/',
+                                        {'remove': [self.recipe.id]},
+                                        format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'missing')
+        self.assertEqual(self.state(), (0, {}))
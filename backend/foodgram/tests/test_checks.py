@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from foodgram.checks import check_shared_cache
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+MEMCACHED = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': 'memcached:11211'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+
+    def error_ids(self):
+        return {error.id for error in check_shared_cache(None)}
+
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_local_cache_rejected_without_debug(self):
+        self.assertIn('foodgram.E001', self.error_ids())
+
+    @override_settings(DEBUG=True, CACHES=LOCMEM)
+    def test_local_cache_allowed_with_debug(self):
+        self.assertNotIn('foodgram.E001', self.error_ids())
+
+    @override_settings(DEBUG=False, CACHES=MEMCACHED)
+    def test_shared_cache_accepted(self):
+        self.assertNotIn('foodgram.E001', self.error_ids())
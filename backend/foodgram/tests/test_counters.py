@@ -0,0 +1,33 @@
+from foodgram.models import FavoriteList, Recipe, ShoppingList
+
+from .base import RecipeDataTestCase
+
+
+class PopularityCountersTest(RecipeDataTestCase):
+    recipes_count = 2
+
+    def setUp(self):
+        super().setUp()
+        self.authorize(self.users[0])
+        self.recipe = self.recipes[0]
+
+    def counters(self):
+        return Recipe.objects.values_list(
+            'favorites_count', 'in_carts_count').get(pk=self.recipe.pk)
+
+    def test_add_and_remove_update_counters(self):
+        url = f'/api/recipes/{self.recipe.id}/favorite/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.counters(), (1, 0))
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_drifted_counter_does_not_go_below_zero(self):
+        FavoriteList.objects.create(user=self.users[0], recipe=self.recipe)
+        ShoppingList.objects.create(user=self.users[0], recipe=self.recipe)
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action=action):
+                response = self.client.delete(
+                    f'/api/recipes/{self.recipe.id}/{action}/')
+                self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counters(), (0, 0))
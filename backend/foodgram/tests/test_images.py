@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from foodgram.models import Recipe
+
+from .base import RecipeDataTestCase, make_image
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class RecipeImageUpdateTest(RecipeDataTestCase):
+    recipes_count = 1
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.recipe = self.recipes[0]
+        self.authorize(self.recipe.author)
+
+    def patch_image(self, color):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                {'image': make_image(color)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response, callbacks
+
+    def test_new_image_replaces_variants(self):
+        _, callbacks = self.patch_image((255, 0, 0))
+        for callback in callbacks:
+            callback()
+        old_variants = Recipe.objects.get(pk=self.recipe.pk).image_variants
+        self.assertTrue(old_variants)
+
+        response, callbacks = self.patch_image((0, 0, 255))
+        # Пока копии не построены, все размеры ведут на новый оригинал.
+        self.assertEqual(set(response.data['image_variants'].values()),
+                         {response.data['image']})
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_variants, {})
+
+        for callback in callbacks:
+            callback()
+        new_variants = Recipe.objects.get(pk=self.recipe.pk).image_variants
+        self.assertEqual(new_variants.keys(), old_variants.keys())
+        for name in old_variants.values():
+            self.assertFalse(default_storage.exists(name), name)
+        for name in new_variants.values():
+            self.assertTrue(default_storage.exists(name), name)
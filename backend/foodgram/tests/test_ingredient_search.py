@@ -0,0 +1,47 @@
+from foodgram.filters import INGREDIENT_SEARCH_LIMIT
+from foodgram.models import Ingredient
+
+from .base import RecipeDataTestCase
+
+
+class IngredientAutocompleteTest(RecipeDataTestCase):
+    recipes_count = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for title in ('Сгущённое молоко', 'Молоко', 'Молоко кокосовое',
+                      'Мука пшеничная', 'Milk'):
+            Ingredient.objects.create(title=title, measurement_unit='г')
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['title'] for ingredient in response.json()]
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(self.search('мол'), [
+            'Молоко', 'Молоко кокосовое', 'Сгущённое молоко'])
+
+    def test_match_inside_word(self):
+        self.assertEqual(self.search('шенич'), ['Мука пшеничная'])
+
+    def test_cyrillic_case_mismatch(self):
+        for name in ('мука', 'МУКА', 'мУкА'):
+            with self.subTest(name=name):
+                self.assertEqual(self.search(name), ['Мука пшеничная'])
+        self.assertEqual(self.search('MILK'), ['Milk'])
+
+    def test_result_is_capped(self):
+        for number in range(INGREDIENT_SEARCH_LIMIT + 5):
+            Ingredient.objects.create(title=f'Соль {number:02}',
+                                      measurement_unit='г')
+        titles = self.search('соль')
+        self.assertEqual(len(titles), INGREDIENT_SEARCH_LIMIT)
+        self.assertEqual(titles, sorted(titles))
+
+    def test_renamed_ingredient_is_found_by_new_title(self):
+        ingredient = Ingredient.objects.get(title='Milk')
+        ingredient.title = 'Кефир'
+        ingredient.save(update_fields=['title'])
+        self.assertEqual(self.search('кеф'), ['Кефир'])
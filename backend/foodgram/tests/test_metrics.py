@@ -0,0 +1,65 @@
+from django.test import override_settings
+from djoser.serializers import UserSerializer
+
+from api.middleware import QueryRecorder, current_recorder
+from api.serializers import RecipeReadSerializer
+from foodgram.models import Recipe
+
+from .base import RecipeDataTestCase
+
+
+class MetricsTest(RecipeDataTestCase):
+    recipes_count = 2
+
+    def test_metrics_are_hidden_from_users(self):
+        self.assertIn(self.client.get('/api/metrics/').status_code,
+                      (401, 403))
+        self.authorize(self.users[0])
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    def test_metrics_for_admin(self):
+        admin = self.users[0]
+        admin.is_staff = True
+        admin.save()
+        self.authorize(admin)
+        self.client.get('/api/recipes/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'foodgram_api_serializer_duration_seconds_sum'
+            '{endpoint="recipes-list"}',
+            response.content.decode())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_by_token(self):
+        self.assertEqual(self.client.get(
+            '/api/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+        ).status_code, 200)
+        self.assertIn(self.client.get(
+            '/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, (401, 403))
+
+    def test_server_timing_separates_serializers(self):
+        response = self.client.get('/api/recipes/')
+        timings = dict(
+            part.strip().split(';', 1)[0:2]
+            for part in response['Server-Timing'].split(','))
+        self.assertEqual(
+            set(timings), {'db', 'view', 'serialize', 'render', 'total'})
+
+    def record_serialization(self, serializer):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        try:
+            serializer.data
+        finally:
+            current_recorder.reset(token)
+        return recorder
+
+    def test_only_project_serializers_are_timed(self):
+        recorder = self.record_serialization(
+            RecipeReadSerializer(Recipe.objects.all(), many=True))
+        self.assertGreater(recorder.serializer_duration, 0)
+        self.assertFalse(recorder.serializing)
+        recorder = self.record_serialization(UserSerializer(self.users[0]))
+        self.assertEqual(recorder.serializer_duration, 0)
@@ -0,0 +1,42 @@
+from urllib.parse import parse_qs, urlparse
+
+from foodgram.models import FavoriteList
+
+from .base import RecipeDataTestCase
+
+
+class CursorPaginationTest(RecipeDataTestCase):
+    recipes_count = 11
+
+    def walk(self, params):
+        ids, cursor = [], ''
+        for _ in range(self.recipes_count + 1):
+            response = self.client.get(
+                '/api/recipes/', {**params, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if not response.data['next']:
+                return ids
+            cursor = parse_qs(urlparse(response.data['next']).query)[
+                'cursor'][0]
+        self.fail('Обход курсором не закончился')
+
+    def test_cursor_walk_returns_every_recipe_once(self):
+        ids = self.walk({'limit': 4})
+        self.assertEqual(ids, sorted(
+            (recipe.id for recipe in self.recipes), reverse=True))
+
+    def test_cursor_rejects_non_unique_ordering(self):
+        FavoriteList.objects.create(user=self.users[0],
+                                    recipe=self.recipes[0])
+        response = self.client.get('/api/recipes/', {
+            'ordering': '-favorites_count', 'cursor': '', 'limit': 4})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_page_number_pagination_with_ordering(self):
+        response = self.client.get('/api/recipes/', {
+            'ordering': '-favorites_count', 'page': 2, 'limit': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], self.recipes_count)
+        self.assertEqual(len(response.data['results']), 4)
@@ -0,0 +1,26 @@
+from .base import RecipeDataTestCase
+
+
+class PantryTest(RecipeDataTestCase):
+    recipes_count = 6
+
+    def get_pantry(self, **params):
+        ingredients = [ingredient.id for ingredient in self.ingredients[:3]]
+        return self.client.get('/api/recipes/pantry/',
+                               {'ingredients': ingredients, **params})
+
+    def test_ranked_by_coverage(self):
+        response = self.get_pantry(max_missing=3)
+        self.assertEqual(response.status_code, 200)
+        coverages = [recipe['coverage']
+                     for recipe in response.data['results']]
+        self.assertEqual(coverages, sorted(coverages, reverse=True))
+        self.assertEqual(coverages[0], 1)
+
+    def test_cursor_parameter_falls_back_to_pages(self):
+        response = self.get_pantry(cursor='', limit=2, max_missing=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('page=2', response.data['next'])
+        self.assertEqual(response.data['count'], self.get_pantry(
+            max_missing=3).data['count'])
@@ -0,0 +1,120 @@
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import resolve
+
+from foodgram.models import FavoriteList
+from foodgram.search import inverted_index
+from users.models import Follow
+
+from .base import RecipeDataTransactionTestCase, make_image
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class QueryBudgetTest(RecipeDataTransactionTestCase):
+    """Каждый эндпоинт из API_QUERY_BUDGETS укладывается в свой бюджет.
+
+    Транзакции настоящие, поэтому on_commit-обработчики (картинки при
+    RECIPE_IMAGE_WORKERS = 0, сброс кэшей) выполняются внутри запроса.
+    """
+    recipes_count = 8
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        Follow.objects.create(user=self.users[0], following=self.users[1])
+
+    def request(self, method, url, data=None):
+        response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, (method, url))
+        endpoint = resolve(url.split('?')[0]).url_name
+        budgets = settings.API_QUERY_BUDGETS
+        budget = budgets.get(f'{method.upper()} {endpoint}',
+                             budgets.get(endpoint))
+        self.assertIsNotNone(budget, f'{method.upper()} {endpoint}')
+        count = int(QUERIES.search(response['Server-Timing']).group(1))
+        with self.subTest(method=method, endpoint=endpoint):
+            self.assertLessEqual(count, budget)
+        return response
+
+    def recipe_payload(self, amount=5):
+        return {
+            'title': 'Новый', 'text': 'Описание', 'cooking_time': 5,
+            'image': make_image(), 'tags': [self.tags[0].id],
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': amount},
+                {'id': self.ingredients[1].id, 'amount': amount},
+            ],
+        }
+
+    def test_public_reads(self):
+        recipe = self.recipes[0]
+        call_command('build_similarity_index', verbosity=0)
+        urls = [
+            '/api/recipes/', '/api/recipes/?cursor=',
+            f'/api/recipes/{recipe.id}/',
+            '/api/tags/', f'/api/tags/{self.tags[0].id}/',
+            '/api/ingredients/?name=Инг',
+            f'/api/ingredients/{self.ingredients[0].id}/',
+            f'/api/recipes/{recipe.id}/similar/',
+            f'/api/recipes/pantry/?ingredients={self.ingredients[0].id}',
+            '/api/recipes/?search=Рецепт',
+        ]
+        # Индекс поиска для SQLite строится один раз на процесс.
+        inverted_index.get_postings()
+        # Без токена и с ним: бюджет включает запрос токена.
+        for user in (None, self.users[0]):
+            if user is not None:
+                self.authorize(user)
+            for url in urls:
+                self.request('get', url)
+
+    def test_authenticated_reads(self):
+        self.authorize(self.users[0])
+        recipe = self.recipes[1]
+        FavoriteList.objects.create(user=self.users[0], recipe=recipe)
+        call_command('build_similarity_index', verbosity=0)
+        self.request('get', '/api/recipes/feed/')
+        self.request('get', '/api/recipes/recommended/')
+        self.request('get', '/api/users/subscriptions/')
+        self.request('post', f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.request('get', '/api/recipes/download_shopping_cart/')
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_recipe_writes(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.authorize(self.users[0])
+            self.request('post', f'/api/recipes/{self.recipes[0].id}/'
+                                 'shopping_cart/')
+            recipe_id = self.request(
+                'post', '/api/recipes/', self.recipe_payload()).data['id']
+            self.client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+            url = f'/api/recipes/{recipe_id}/'
+            self.request('patch', url, self.recipe_payload(amount=7))
+            self.request('put', url, self.recipe_payload(amount=9))
+            self.request('delete', url)
+
+    def test_memberships(self):
+        self.authorize(self.users[0])
+        recipe = self.recipes[2]
+        for action in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            self.request('post', url)
+            self.request('delete', url)
+            self.request('post', f'/api/recipes/{action}/bulk/', {
+                'add': [self.recipes[3].id, self.recipes[4].id]})
+            self.request('post', f'/api/recipes/{action}/bulk/', {
+                'add': [self.recipes[5].id],
+                'remove': [self.recipes[3].id, self.recipes[4].id],
+            })
+        url = f'/api/users/{self.users[2].id}/subscribe/'
+        self.request('post', url)
+        self.request('delete', url)
+        self.request('post', '/api/users/subscribe/bulk/', {
+            'add': [self.users[2].id], 'remove': [self.users[1].id]})
@@ -0,0 +1,24 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from foodgram.management.commands.check_query_plans import (
+    check_recipe_list_plans)
+from foodgram.models import FavoriteList, ShoppingList
+
+from .base import RecipeDataTestCase
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Планы с enable_seqscan = off проверяются только на PostgreSQL')
+class RecipeListPlansTest(RecipeDataTestCase):
+    """Фильтры и сортировки списка рецептов не читают таблицы целиком."""
+
+    def test_no_seq_scans_on_watched_tables(self):
+        user = self.users[0]
+        FavoriteList.objects.create(user=user, recipe=self.recipes[0])
+        ShoppingList.objects.create(user=user, recipe=self.recipes[1])
+        tags = [tag.slug for tag in self.tags[:2]]
+        for label, plan, problems in check_recipe_list_plans(user, tags):
+            with self.subTest(label):
+                self.assertEqual(problems, [], plan)
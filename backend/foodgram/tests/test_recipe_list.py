@@ -0,0 +1,37 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import RecipeDataTestCase
+
+# Токен, COUNT, рецепты, теги, ингредиенты — независимо от limit.
+RECIPE_LIST_QUERIES = 5
+
+
+class RecipeListQueriesTest(RecipeDataTestCase):
+    recipes_count = 12
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.authorize(self.users[0])
+        for limit in (1, 6, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_item_has_nested_author_tags_and_ingredients(self):
+        self.authorize(self.users[0])
+        response = self.client.get('/api/recipes/', {'limit': 1})
+        recipe = response.data['results'][0]
+        self.assertEqual(recipe['id'], self.recipes[-1].id)
+        self.assertEqual(recipe['author']['id'], self.recipes[-1].author_id)
+        self.assertEqual(len(recipe['ingredients']), 3)
+        self.assertFalse(recipe['is_favorited'])
+
+    def test_detail_query_count(self):
+        self.authorize(self.users[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), RECIPE_LIST_QUERIES)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from foodgram.models import Ingredient
+
+from .base import RecipeDataTestCase
+
+
+class AnonymousResponseCacheTest(RecipeDataTestCase):
+    recipes_count = 3
+
+    def get_ingredient(self, recipe, ingredient):
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        return next(item for item in response.json()['ingredients']
+                    if item['id'] == ingredient.id)
+
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.client.get('/api/recipes/', {'limit': 2})
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/recipes/', {'limit': 2})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+
+    def test_etag_returns_not_modified(self):
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_change_invalidates_detail(self):
+        recipe = self.recipes[0]
+        self.client.get(f'/api/recipes/{recipe.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.title = 'Новое название'
+            recipe.save()
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.json()['title'], 'Новое название')
+
+    def test_load_ingredients_invalidates_cached_bodies(self):
+        recipe = self.recipes[0]
+        ingredient = recipe.recipe_ingredients.first().ingredient
+        self.assertEqual(
+            self.get_ingredient(recipe, ingredient)['measurement_unit'], 'г')
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write(f'{ingredient.title},кг\n')
+        self.addCleanup(os.remove, file.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('load_ingredients', file.name, stdout=StringIO())
+        self.assertEqual(
+            Ingredient.objects.get(pk=ingredient.pk).measurement_unit, 'кг')
+        self.assertEqual(
+            self.get_ingredient(recipe, ingredient)['measurement_unit'], 'кг')
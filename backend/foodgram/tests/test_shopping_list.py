@@ -0,0 +1,158 @@
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from foodgram.models import RecipeIngredient, ShoppingListItem
+from foodgram.shopping import rebuild_items
+
+from .base import RecipeDataTestCase
+
+
+class ShoppingListItemsTest(RecipeDataTestCase):
+    """Суммы ShoppingListItem ведутся по шагам и сходятся с SUM."""
+    recipes_count = 4
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.authorize(self.user)
+
+    def expected(self):
+        rows = RecipeIngredient.objects.filter(
+            recipe__shoppinglist__user=self.user
+        ).values('ingredient_id', 'base_unit').annotate(
+            total=Sum('quantity'))
+        return {(row['ingredient_id'], row['base_unit']): row['total']
+                for row in rows}
+
+    def items(self):
+        rows = ShoppingListItem.objects.filter(user=self.user).values_list(
+            'ingredient_id', 'base_unit', 'total_quantity')
+        return {(ingredient_id, base_unit): total
+                for ingredient_id, base_unit, total in rows}
+
+    def add(self, recipe):
+        response = self.client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_and_remove(self):
+        for recipe in self.recipes[:3]:
+            self.add(recipe)
+            self.assertEqual(self.items(), self.expected())
+        response = self.client.delete(
+            f'/api/recipes/{self.recipes[1].id}/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.items(), self.expected())
+
+    def test_remove_last_recipe_deletes_items(self):
+        self.add(self.recipes[0])
+        self.client.delete(f'/api/recipes/{self.recipes[0].id}/shopping_cart/')
+        self.assertEqual(self.items(), {})
+
+    def test_bulk_cart(self):
+        response = self.client.post('/api/recipes/shopping_cart/bulk/', {
+            'add': [recipe.id for recipe in self.recipes[:3]]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.items(), self.expected())
+        response = self.client.post('/api/recipes/shopping_cart/bulk/', {
+            'remove': [self.recipes[0].id, self.recipes[2].id]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.items(), self.expected())
+
+    def test_edit_recipe_ingredients(self):
+        recipe = self.recipes[0]
+        self.add(recipe)
+        self.add(self.recipes[1])
+        self.authorize(recipe.author)
+        response = self.client.patch(f'/api/recipes/{recipe.id}/', {
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 100},
+                {'id': self.ingredients[5].id, 'amount': 7},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.items(), self.expected())
+
+    def test_delete_recipe(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        self.authorize(self.recipes[1].author)
+        response = self.client.delete(f'/api/recipes/{self.recipes[1].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.items(), self.expected())
+
+    def test_rebuild_matches_incremental(self):
+        for recipe in self.recipes[:3]:
+            self.add(recipe)
+        incremental = self.items()
+        rebuild_items(self.user.id)
+        self.assertEqual(self.items(), incremental)
+
+
+class IngredientUnitsTest(RecipeDataTestCase):
+    """Дробные количества и свои единицы ингредиентов в рецептах."""
+    recipes_count = 3
+
+    def setUp(self):
+        super().setUp()
+        self.flour = self.ingredients[0]
+
+    def set_ingredients(self, recipe, *ingredients):
+        self.authorize(recipe.author)
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': list(ingredients)}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['ingredients']
+
+    def test_fractional_amount_in_own_unit(self):
+        ingredients = self.set_ingredients(
+            self.recipes[0], {'id': self.flour.id, 'amount': 0.5,
+                              'unit': 'кг'})
+        self.assertEqual(ingredients[0]['amount'], 0.5)
+        self.assertEqual(ingredients[0]['measurement_unit'], 'кг')
+        recipe_ingredient = RecipeIngredient.objects.get(
+            recipe=self.recipes[0])
+        self.assertEqual(recipe_ingredient.quantity, Decimal(500))
+        self.assertEqual(recipe_ingredient.base_unit, 'г')
+
+    def test_whole_amount_without_unit(self):
+        ingredients = self.set_ingredients(
+            self.recipes[0], {'id': self.flour.id, 'amount': 200})
+        self.assertEqual(ingredients[0]['amount'], 200)
+        self.assertEqual(ingredients[0]['measurement_unit'], 'г')
+
+    def test_same_base_unit_merges(self):
+        self.set_ingredients(self.recipes[0], {
+            'id': self.flour.id, 'amount': 1, 'unit': 'кг'})
+        self.set_ingredients(self.recipes[1], {
+            'id': self.flour.id, 'amount': 500})
+        self.set_ingredients(self.recipes[2], {
+            'id': self.flour.id, 'amount': 2, 'unit': 'шт'})
+        user = self.users[0]
+        self.authorize(user)
+        for recipe in self.recipes:
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        items = dict(ShoppingListItem.objects.filter(user=user).values_list(
+            'base_unit', 'total_quantity'))
+        self.assertEqual(items, {'г': Decimal(1500), 'шт.': Decimal(2)})
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'txt'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertIn(f'{self.flour.title} (кг) — 1.5', lines)
+        self.assertIn(f'{self.flour.title} (шт.) — 2', lines)
+
+    def test_ingredient_unit_change_keeps_own_units(self):
+        self.set_ingredients(self.recipes[0], {
+            'id': self.flour.id, 'amount': 1, 'unit': 'кг'})
+        self.set_ingredients(self.recipes[1], {
+            'id': self.flour.id, 'amount': 2})
+        self.flour.measurement_unit = 'кг'
+        self.flour.save()
+        quantities = dict(RecipeIngredient.objects.filter(
+            ingredient=self.flour).values_list('recipe_id', 'quantity'))
+        self.assertEqual(quantities, {self.recipes[0].id: Decimal(1000),
+                                      self.recipes[1].id: Decimal(2000)})
@@ -0,0 +1,78 @@
+from foodgram.models import Recipe
+
+from .base import RecipeDataTestCase
+
+
+class SparseRecipeFieldsTest(RecipeDataTestCase):
+    recipes_count = 8
+
+    def test_fields_profile_and_expand(self):
+        response = self.client.get(
+            '/api/recipes/', {'fields': 'card', 'expand': 'author',
+                              'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['results'][0]), {
+            'id', 'title', 'image', 'image_variants', 'cooking_time',
+            'is_favorited', 'is_in_shopping_cart', 'author'})
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/recipes/', {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_pages_are_separate_per_fieldset(self):
+        requests = [{'limit': 1}, {'limit': 1, 'fields': 'card'},
+                    {'limit': 1, 'fields': 'card', 'expand': 'author'},
+                    {'limit': 1, 'expand': 'author'}]
+        for params in requests * 2:
+            with self.subTest(params=params):
+                body = self.client.get('/api/recipes/', params).json()
+                for name, value in params.items():
+                    self.assertIn(f'{name}={value}', body['next'])
+                if 'fields' in params:
+                    self.assertNotIn('text', body['results'][0])
+                else:
+                    self.assertIn('text', body['results'][0])
+
+    def test_ordering_columns_are_loaded(self):
+        recipe = Recipe.objects.for_read(
+            self.users[0], frozenset({'id'}), ['-favorites_count', '-id'])[0]
+        self.assertNotIn('favorites_count', recipe.get_deferred_fields())
+        self.assertIn('text', recipe.get_deferred_fields())
+
+    def test_sparse_page_query_count_does_not_grow(self):
+        self.authorize(self.users[0])
+        for params in ({'ordering': '-favorites_count'}, {'cursor': ''}):
+            for limit in (1, 8):
+                with self.subTest(limit=limit, **params):
+                    # Токен, COUNT (без курсора) и сами рецепты.
+                    with self.assertNumQueries(2 if 'cursor' in params
+                                               else 3):
+                        response = self.client.get('/api/recipes/', {
+                            **params, 'fields': 'id', 'limit': limit})
+                    self.assertEqual(len(response.data['results']), limit)
+
+
+class SparseUserFieldsTest(RecipeDataTestCase):
+    recipes_count = 0
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.authorize(self.user)
+
+    def test_me_profile_and_list(self):
+        for url in ('/api/users/me/', f'/api/users/{self.user.id}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'fields': 'username'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(set(response.data), {'id', 'username'})
+        response = self.client.get('/api/users/', {'fields': 'email'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [set(user) for user in response.data],
+            [{'id', 'email'}])
+
+    def test_full_profile_has_subscription_flag(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], self.user.email)
+        self.assertFalse(response.data['is_subscribed'])
@@ -0,0 +1,39 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Follow
+
+from .base import RecipeDataTestCase
+
+
+class SubscriptionsTest(RecipeDataTestCase):
+    recipes_count = 9
+
+    def setUp(self):
+        super().setUp()
+        Follow.objects.create(user=self.users[0], following=self.users[1])
+        Follow.objects.create(user=self.users[0], following=self.users[2])
+        self.authorize(self.users[0])
+
+    def test_previews_are_limited_per_author(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        for author in response.data['results']:
+            own = [recipe.id for recipe in self.recipes
+                   if recipe.author_id == author['id']]
+            self.assertEqual(author['recipes_count'], len(own))
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']],
+                sorted(own, reverse=True)[:2])
+
+    def test_previews_load_only_preview_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/users/subscriptions/', {'recipes_limit': 2})
+        preview_sql = [query['sql'] for query in queries
+                       if 'ROW_NUMBER' in query['sql']]
+        self.assertEqual(len(preview_sql), 1)
+        outer_select = preview_sql[0].split(' FROM ', 1)[0]
+        self.assertNotIn('text', outer_select)
+        self.assertNotIn('search_vector', outer_select)
+        self.assertNotIn('image_variants', outer_select)
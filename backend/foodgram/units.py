@@ -0,0 +1,93 @@
+"""Единицы измерения ингредиентов и перевод в базовые.
+
+measurement_unit у Ingredient — свободный текст. Известные единицы
+сводятся к базовой единице своей величины (г, мл, шт.) с множителем;
+количество в рецепте хранится в базовых единицах вместе с самой
+базовой единицей, поэтому суммы в списке покупок считаются простым
+SUM по паре (ингредиент, базовая единица): "1 кг" и "500 г" муки
+складываются, а "2 шт." остаются отдельной строкой. Остальные единицы
+("по вкусу", "пучок") считаются базовыми сами для себя.
+"""
+import re
+from collections import namedtuple
+from decimal import Decimal
+
+Unit = namedtuple('Unit', 'base factor')
+
+# Базовая единица → написания единиц этой величины и их множители
+UNITS = {
+    'г': {
+        'г': 1, 'гр': 1, 'грамм': 1,
+        'кг': 1000, 'килограмм': 1000,
+        'мг': Decimal('0.001'),
+    },
+    'мл': {
+        'мл': 1, 'миллилитр': 1,
+        'л': 1000, 'литр': 1000,
+        'стакан': 250,
+        'ст. л.': 15, 'столовая ложка': 15,
+        'ч. л.': 5, 'чайная ложка': 5,
+        'капля': Decimal('0.05'),
+    },
+    'шт.': {
+        'шт.': 1, 'штука': 1,
+        'десяток': 10,
+    },
+}
+# Крупные единицы для вывода сумм, кроме единицы самого ингредиента
+DISPLAY_UNITS = {
+    'г': (('кг', 1000), ('г', 1)),
+    'мл': (('л', 1000), ('мл', 1)),
+}
+QUANTITY_PLACES = Decimal('0.001')
+
+
+def unit_key(unit):
+    """"Ст.л." и "ст. л." — одна единица, как и "шт" и "шт."."""
+    return re.sub(r'[\s.]+', '', unit.lower())
+
+
+def build_unit_table(units):
+    table = {}
+    for base, factors in units.items():
+        for name, factor in factors.items():
+            table[unit_key(name)] = Unit(base, Decimal(factor))
+    return table
+
+
+UNIT_TABLE = build_unit_table(UNITS)
+
+
+def lookup(unit):
+    """Базовая единица и множитель; незнакомая единица — сама себе база."""
+    return UNIT_TABLE.get(unit_key(unit)) or Unit(unit, Decimal(1))
+
+
+def to_base(amount, unit):
+    """(количество в базовых единицах, базовая единица).
+
+    Количество округлено до хранимой точности.
+    """
+    base, factor = lookup(unit)
+    return (Decimal(amount) * factor).quantize(QUANTITY_PLACES), base
+
+
+def format_quantity(value):
+    value = value.quantize(QUANTITY_PLACES).normalize()
+    return f'{value:f}'
+
+
+def humanize(quantity, unit):
+    """Сумма в базовых единицах → (количество, единица) для вывода.
+
+    Берётся самая крупная из единиц ингредиента и DISPLAY_UNITS, в
+    которой выходит не меньше единицы: 1500 г — "1.5 кг", 45 мл у
+    ингредиента в столовых ложках — "3 ст. л.".
+    """
+    base, factor = lookup(unit)
+    candidates = [(unit, factor), *DISPLAY_UNITS.get(base, ())]
+    candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+    for name, factor in candidates:
+        if quantity >= factor:
+            break
+    return format_quantity(quantity / factor), name
@@ -1,46 +1,115 @@
-import csv
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, AllowAny,
+                                        IsAuthenticated)
 from rest_framework.response import Response
 
-from .models import Tag, Recipe, Ingredient, FavoriteList, ShoppingList
-from .filters import RecipeFilter
+from .models import (Tag, Recipe, Ingredient, FavoriteList, ShoppingList,
+                     ShoppingListItem, SimilarRecipe)
+from .cache import CachedReferenceMixin, ingredient_cache, tag_cache
+from .feed import feed_head_cache
+from .response_cache import AnonymousRecipeCacheMixin, recipe_response_cache
+from .filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from .renderers import (ShoppingCartCSVRenderer, ShoppingCartPDFRenderer,
+                        ShoppingCartTextRenderer)
+from .shopping import add_to_items, subtract_from_items
+from .units import humanize, lookup
+from api.bulk import apply_membership_changes
 from api.permissions import IsAdminOrAuthorOrReadOnly
+from api.sparse import SparseFieldsetMixin
+from users.pagination import (LimitCursorPagination,
+                              LimitPageNumberPagination, LimitPagePagination)
 from api.serializers import TagSerializer, IngredientSerializer,\
-    FavoriteRecipeSerializer, ShoppingListSerializer
+    FavoriteRecipeSerializer, ShoppingListSerializer,\
+    RecipeReadSerializer, RecipeWriteSerializer, PantryQuerySerializer,\
+    PantryRecipeSerializer, BulkMembershipSerializer
 
 
 User = get_user_model()
 
+CART_CHUNK_SIZE = 500
+# Не больше, чем build_similarity_index хранит соседей по умолчанию
+NEIGHBORS_LIMIT = 20
+# Рекомендации строятся от стольких последних рецептов в избранном
+RECOMMEND_FROM_FAVORITES = 50
+# ?fields=card — карточка рецепта для сетки
+RECIPE_CARD_FIELDS = ('id', 'title', 'image', 'image_variants',
+                      'cooking_time', 'is_favorited', 'is_in_shopping_cart')
+
+
+def humanize_cart(rows):
+    """Суммы из базовых единиц в удобные: 1500 г → 1.5 кг."""
+    for title, unit, base_unit, quantity in rows:
+        if lookup(unit).base != base_unit:
+            # В рецептах указана единица другой величины, чем у
+            # ингредиента, например шт. вместо г.
+            unit = base_unit
+        amount, display_unit = humanize(quantity, unit)
+        yield title, display_unit, amount
+
+
+def get_neighbors_limit(request):
+    limit = request.query_params.get('limit', '')
+    if not limit.isdigit():
+        return settings.PAGE_SIZE
+    return min(int(limit), NEIGHBORS_LIMIT)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    reference_cache = tag_cache
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReferenceMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    reference_cache = ingredient_cache
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsetMixin, AnonymousRecipeCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    filter_backends = [DjangoFilterBackend]
+    sparse_profiles = {'card': RECIPE_CARD_FIELDS}
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
+    ordering_fields = ('favorites_count', 'in_carts_count')
     permission_classes = [IsAdminOrAuthorOrReadOnly]
+    pagination_class = LimitPagePagination
 
-    def main(self, request, pk, act, serialize):
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(
+                self.request.user, self.get_sparse_fields(),
+                self.get_ordering())
+        return Recipe.objects.all()
+
+    def get_ordering(self):
+        """Сортировка из ?ordering=, которую применит RecipeOrderingFilter."""
+        return RecipeOrderingFilter().get_ordering(
+            self.request, self.queryset, self) or ()
+
+    def get_serializer_class(self):
+        if self.request.method in SAFE_METHODS:
+            return RecipeReadSerializer
+        return RecipeWriteSerializer
+
+    @transaction.atomic
+    def main(self, request, pk, act, serialize, counter,
+             on_add=None, on_remove=None):
         if request.method == 'POST':
             data = {'user': request.user.id, 'recipe': pk}
             serializer = serialize(
@@ -49,44 +118,192 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            if on_add is not None:
+                on_add([serializer.instance.recipe_id], request.user.id)
+            Recipe.objects.filter(id=pk).update(**{counter: F(counter) + 1})
+            recipe_response_cache.invalidate_recipe(pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
             user = request.user
             recipe = get_object_or_404(Recipe, id=pk)
+            # Блокировка: параллельное удаление той же строки дождётся
+            # этого и получит 404, суммы не вычтутся дважды.
             favorite = get_object_or_404(
-                act, user=user, recipe=recipe
+                act.objects.select_for_update(), user=user, recipe=recipe
             )
+            if on_remove is not None:
+                on_remove([recipe.id], user.id)
             favorite.delete()
+            Recipe.objects.filter(id=pk).update(
+                **{counter: Greatest(F(counter) - 1, 0)})
+            recipe_response_cache.invalidate_recipe(pk)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @transaction.atomic
+    def bulk(self, request, act, counter, on_add=None, on_remove=None):
+        serializer = BulkMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, added, removed = apply_membership_changes(
+            request.user, act, 'recipe', Recipe.objects.all(),
+            on_add=on_add, on_remove=on_remove, **serializer.validated_data)
+        if added:
+            Recipe.objects.filter(id__in=added).update(
+                **{counter: F(counter) + 1})
+        if removed:
+            Recipe.objects.filter(id__in=removed).update(
+                **{counter: Greatest(F(counter) - 1, 0)})
+        recipe_response_cache.invalidate_recipes([*added, *removed])
+        return Response({'results': results})
+
     @action(methods=['post', 'delete'], detail=True,
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
-        self.main(request=request, pk=pk,
-                  act=FavoriteList,
-                  serialize=FavoriteRecipeSerializer)
+        return self.main(request=request, pk=pk,
+                         act=FavoriteList,
+                         serialize=FavoriteRecipeSerializer,
+                         counter='favorites_count')
 
     @action(methods=['post', 'delete'], detail=True,
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
-        self.main(request=request, pk=pk,
-                  act=ShoppingList,
-                  serialize=ShoppingListSerializer)
+        return self.main(request=request, pk=pk,
+                         act=ShoppingList,
+                         serialize=ShoppingListSerializer,
+                         counter='in_carts_count',
+                         on_add=add_to_items,
+                         on_remove=subtract_from_items)
+
+    @action(methods=['post'], detail=False, url_path='favorite/bulk',
+            permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        return self.bulk(request=request,
+                         act=FavoriteList,
+                         counter='favorites_count')
+
+    @action(methods=['post'], detail=False, url_path='shopping_cart/bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        return self.bulk(request=request,
+                         act=ShoppingList,
+                         counter='in_carts_count',
+                         on_add=add_to_items,
+                         on_remove=subtract_from_items)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=LimitCursorPagination)
+    def feed(self, request):
+        user = request.user
+        fields = self.get_sparse_fields()
+        queryset = Recipe.objects.for_read(user, fields).filter(
+            author__following__user=user)
+        head_size = settings.RECIPE_FEED_HEAD_SIZE
+        if head_size and not request.query_params.get('cursor'):
+            head = feed_head_cache.get_head(user)
+            limit = self.paginator.get_page_size(request)
+            # Для ссылки next нужен ещё один рецепт сверх страницы.
+            if limit < len(head) or len(head) < head_size:
+                queryset = Recipe.objects.for_read(user, fields).filter(
+                    id__in=head[:limit + 1])
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    # Страница строится по кортежам из values_list, а -coverage не
+    # уникально, так что курсор здесь не поддерживается.
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny],
+            pagination_class=LimitPageNumberPagination)
+    def pantry(self, request):
+        params = PantryQuerySerializer(data={
+            **request.query_params.dict(),
+            'ingredients': request.query_params.getlist('ingredients'),
+        })
+        params.is_valid(raise_exception=True)
+        ranked = Recipe.objects.with_pantry_coverage(
+            params.validated_data['ingredients']
+        ).filter(
+            missing_count__lte=params.validated_data['max_missing']
+        ).order_by('-coverage', 'missing_count', '-id')
+        page = self.paginate_queryset(
+            ranked.values_list('id', 'coverage', 'missing_count'))
+        recipes = Recipe.objects.for_read(
+            request.user, self.get_sparse_fields()
+        ).in_bulk([recipe_id for recipe_id, _, _ in page])
+        for recipe_id, coverage, missing_count in page:
+            recipes[recipe_id].coverage = coverage
+            recipes[recipe_id].missing_count = missing_count
+        serializer = PantryRecipeSerializer(
+            [recipes[recipe_id] for recipe_id, _, _ in page],
+            many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    def recipes_response(self, recipe_ids):
+        recipes = Recipe.objects.for_read(
+            self.request.user, self.get_sparse_fields()
+        ).in_bulk(recipe_ids)
+        serializer = RecipeReadSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
 
-    @action(detail=False,  methods=['get'])
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def similar(self, request, pk):
+        neighbor_ids = list(SimilarRecipe.objects.filter(
+            recipe_id=pk
+        ).order_by('-score').values_list(
+            'neighbor_id', flat=True
+        )[:get_neighbors_limit(request)])
+        if not neighbor_ids and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        return self.recipes_response(neighbor_ids)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def recommended(self, request):
+        favorites = FavoriteList.objects.filter(user=request.user)
+        recent = favorites.order_by('-date_created').values(
+            'recipe_id')[:RECOMMEND_FROM_FAVORITES]
+        limit = get_neighbors_limit(request)
+        recipe_ids = list(SimilarRecipe.objects.filter(
+            recipe_id__in=recent
+        ).exclude(
+            neighbor_id__in=favorites.values('recipe_id')
+        ).values('neighbor_id').annotate(
+            total_score=Sum('score')
+        ).order_by('-total_score', '-neighbor_id').values_list(
+            'neighbor_id', flat=True
+        )[:limit])
+        if not recipe_ids:
+            # Без избранного или до первого расчёта индекса
+            recipe_ids = list(Recipe.objects.exclude(
+                id__in=favorites.values('recipe_id')
+            ).order_by('-favorites_count', '-id').values_list(
+                'id', flat=True
+            )[:limit])
+        return self.recipes_response(recipe_ids)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=[ShoppingCartCSVRenderer,
+                              ShoppingCartTextRenderer,
+                              ShoppingCartPDFRenderer])
     def download_shopping_cart(self, request):
         ingredient_amount = (
-            Ingredient.objects.filter(
-                ingredients_in_recipe__recipe__in_baskets=request.user
-            )
-            .values_list('name', 'measurement_unit')
-            .annotate(amount=Sum('ingredients_in_recipe__amount'))
+            ShoppingListItem.objects.filter(user=request.user)
+            .values_list('ingredient__title', 'ingredient__measurement_unit',
+                         'base_unit', 'total_quantity')
+            .order_by('ingredient__title', 'base_unit')
+        )
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(humanize_cart(
+                ingredient_amount.iterator(chunk_size=CART_CHUNK_SIZE))),
+            content_type=content_type
         )
-        response = HttpResponse(content_type="text/csv")
         response[
             'Content-Disposition'
-        ] = 'attachment; filename=ingredients.csv'
-        writer = csv.writer(response)
-        for name, unit, amount in ingredient_amount:
-            writer.writerow([name, amount, unit])
+        ] = f'attachment; filename={renderer.get_filename()}'
         return response
@@ -1,8 +1,65 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from backend.settings import PAGE_SIZE
 
 
-class LimitPagePagination(PageNumberPagination):
+def is_unique_field(model, ordering):
+    if not isinstance(ordering, str):
+        return False
+    try:
+        field = model._meta.get_field(ordering.lstrip('-'))
+    except FieldDoesNotExist:
+        return False
+    return field.primary_key or field.unique
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсорная пагинация по сортировке самого queryset.
+
+    Страница выбирается условием по индексированному полю сортировки,
+    без OFFSET и без подсчёта общего количества строк. DRF ставит курсор
+    только по первому полю сортировки, поэтому оно должно быть
+    уникальным: на повторяющихся значениях обход зацикливается.
+    """
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(
+            queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or not is_unique_field(queryset.model, ordering[0]):
+            raise ValidationError({self.cursor_query_param: [
+                'Курсор работает только с сортировкой по id'
+            ]})
+        return ordering
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class LimitPageNumberPagination(PageNumberPagination):
+    """Только номера страниц — для выборок, где курсору не на что опереться."""
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+
+
+class LimitPagePagination(LimitPageNumberPagination):
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = LimitCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,17 +1,22 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import FollowListAPIView, UserFollowApiView
+from .views import (FollowListAPIView, UserFollowApiView,
+                    UserFollowBulkApiView, UserViewSet)
 
 app_name = 'users'
 
 router_v1 = DefaultRouter()
+router_v1.register('users', UserViewSet)
 
 urlpatterns = [
+    path('users/subscribe/bulk/', UserFollowBulkApiView.as_view(),
+         name='subscribe-bulk'),
     path('users/<int:id>/subscribe/', UserFollowApiView.as_view(),
          name='subscribe'),
-    path('users/subscriptions/', FollowListAPIView.as_view()),
-    path('', include('djoser.urls')),
+    path('users/subscriptions/', FollowListAPIView.as_view(),
+         name='subscriptions'),
+    path('', include(router_v1.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 
 ]
@@ -1,24 +1,70 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BooleanField, Count, Value
 from django.shortcuts import get_object_or_404
+from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import generics, status, views
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Follow
+from .models import Follow, User
 from .pagination import LimitPagePagination
-from api.serializers import FollowListSerializer, UserFollowSerializer
+from api.bulk import apply_membership_changes
+from api.serializers import (BulkFollowSerializer, FollowListSerializer,
+                             UserFollowSerializer, get_recipes_limit)
+from api.sparse import SparseFieldsetMixin
+from foodgram.feed import feed_head_cache
+from foodgram.models import Recipe
+
+# Поля FollowListSerializer, которые читаются прямо из таблицы
+USER_COLUMNS = frozenset(
+    ('id', 'email', 'username', 'first_name', 'last_name'))
+
+
+def attach_recipes_preview(authors, recipes_limit):
+    """Подставляет авторам превью рецептов, загруженное одним запросом."""
+    previews = defaultdict(list)
+    recipes = Recipe.objects.latest_by_author(
+        [author.id for author in authors], recipes_limit)
+    for recipe in recipes:
+        previews[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipes_preview = previews[author.id]
 
 
-class FollowListAPIView(generics.ListAPIView):
+class UserViewSet(SparseFieldsetMixin, DjoserUserViewSet):
+    """Пользователи djoser с ?fields= для списка, профиля и /me/."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if self.request.method in SAFE_METHODS and fields is not None:
+            queryset = queryset.only(*(fields & USER_COLUMNS))
+        return queryset
+
+
+class FollowListAPIView(SparseFieldsetMixin, generics.ListAPIView):
     pagination_class = LimitPagePagination
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        fields = self.get_sparse_fields()
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
+        if fields is not None:
+            queryset = queryset.only(*(fields & USER_COLUMNS))
+        if fields is None or 'recipes_count' in fields:
+            queryset = queryset.annotate(
+                recipes_count=Count('recipes', distinct=True))
         page = self.paginate_queryset(queryset)
+        if fields is None or 'recipes' in fields:
+            attach_recipes_preview(page, get_recipes_limit(request))
         serializer = FollowListSerializer(
             page, many=True,
-            context={'request': request}
+            context=self.get_serializer_context()
         )
         return self.get_paginated_response(serializer.data)
 
@@ -47,3 +93,22 @@ class UserFollowApiView(views.APIView):
         )
         follow.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserFollowBulkApiView(views.APIView):
+    permission_classes = [IsAuthenticated, ]
+
+    @transaction.atomic
+    def post(self, request):
+        serializer = BulkFollowSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        results, added, removed = apply_membership_changes(
+            request.user, Follow, 'following', User.objects.all(),
+            **serializer.validated_data)
+        if added or removed:
+            # bulk_create не шлёт post_save, лента сбрасывается здесь.
+            feed_head_cache.invalidate_users([request.user.id])
+        return Response({'results': results})